@@ -19,12 +19,29 @@ class Command(BaseCommand):
 
     ordered = ['bag', 'hr', 'brk']
 
+    indexes = {
+        'bag': 'DS_BAG_INDEX',
+        'hr': 'DS_HR_INDEX',
+        'brk': 'DS_BRK_INDEX',
+    }
+
     recreate_indexes = {
         'bag': (bagbatch.ReBuildIndexDsBAGJob,),
         'hr': (hrbatch.ReBuildIndexDsHRJob,),
         'brk': (brkbatch.ReBuildIndexDsBRKJob,)
     }
 
+    stats_commands = {
+        'bag': (bagbatch.FacetStatsIndexDsBAGJob,),
+        'hr': (hrbatch.FacetStatsIndexDsHRJob,),
+        'brk': (brkbatch.FacetStatsIndexDsBRKJob,)
+    }
+
+    export_commands = {
+        'bag': (bagbatch.PrebuiltExportIndexDsBAGJob,),
+        'hr': (hrbatch.PrebuiltExportIndexDsHRJob,),
+    }
+
     def add_arguments(self, parser):
         parser.add_argument(
             'dataset',
@@ -47,6 +64,22 @@ class Command(BaseCommand):
             default=False,
             help='Delete and recreate elastic indexes')
 
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            dest='stats',
+            default=False,
+            help='Collect facet statistics of finished elastic indexes. '
+                 'Runs after --build unless the build is --partial')
+
+        parser.add_argument(
+            '--exports',
+            action='store_true',
+            dest='exports',
+            default=False,
+            help='Write the prebuilt exports of finished elastic indexes. '
+                 'Runs after --build unless the build is --partial')
+
         parser.add_argument(
             '--partial',
             action='store',
@@ -83,6 +116,18 @@ class Command(BaseCommand):
                 for job_class in self.datasetcommands[ds]:
                     batch.execute(job_class(), )
 
+            # A partial build does not see the whole index, the
+            # statistics are collected once all parts are done
+            if options['stats'] or (
+                    options['build'] and not options['partial_index']):
+                for job_class in self.stats_commands[ds]:
+                    batch.execute(job_class())
+
+            if options['exports'] or (
+                    options['build'] and not options['partial_index']):
+                for job_class in self.export_commands.get(ds, ()):
+                    batch.execute(job_class())
+
         self.stdout.write(
             "Total Duration: %.2f seconds" % (time.time() - start))
 
@@ -9,6 +9,8 @@ https://docs.djangoproject.com/en/1.9/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/1.9/ref/settings/
 """
+import tempfile
+
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
 
@@ -83,6 +85,18 @@ ELASTIC_SEARCH_HOSTS = ["{}:{}".format(
     get_variable('ELASTIC_HOST_OVERRIDE', 'elasticsearch', 'localhost'),
     get_variable('ELASTIC_PORT_OVERRIDE', '9200'))]
 
+# Size of the keep-alive connection pool of the shared client per worker
+ELASTIC_POOL_SIZE = int(os.getenv('ELASTIC_POOL_SIZE', '10'))
+
+# Request timeouts in seconds per endpoint class
+ELASTIC_TIMEOUTS = {
+    'default': 10,
+    'search': 10,
+    'geolocation': 20,
+    'export': 60,
+    'health': 5,
+}
+
 ELASTIC_INDICES = {
     'DS_BAG_INDEX': 'ds_bag_index',
     'DS_HR_INDEX': 'ds_hr_index',
@@ -101,10 +115,147 @@ if TESTING:
     for k, v in ELASTIC_INDICES.items():
         ELASTIC_INDICES[k] = 'test_{}'.format(v)
 
+# Search result cache, see datasets/generic/cache.py
+# The in-process tier is LRU, the shared tier lives on disk and
+# should be on a volume shared by all workers.
+SEARCH_CACHE_DIR = os.getenv(
+    'SEARCH_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'dataselectie_cache'))
+# Vector tiles of the geolocation views are cached on disk as well
+TILE_CACHE_DIR = os.getenv(
+    'TILE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'dataselectie_tiles'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'search_local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'search',
+        'TIMEOUT': int(os.getenv('SEARCH_CACHE_LOCAL_TTL', '60')),
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
+    'search_shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SEARCH_CACHE_DIR,
+        'TIMEOUT': int(os.getenv('SEARCH_CACHE_SHARED_TTL', '600')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'tiles': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TILE_CACHE_DIR,
+        'TIMEOUT': int(os.getenv('TILE_CACHE_TTL', '86400')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+if TESTING:
+    CACHES['search_shared']['LOCATION'] = tempfile.mkdtemp(
+        prefix='dataselectie_cache_')
+    CACHES['tiles']['LOCATION'] = tempfile.mkdtemp(
+        prefix='dataselectie_tiles_')
+
+# Seconds a reverse proxy may serve the anonymous BAG endpoints from cache
+BAG_CACHE_MAX_AGE = int(os.getenv('BAG_CACHE_MAX_AGE', '300'))
+
 # The size of the preview to fetch from elastic
 SEARCH_PREVIEW_SIZE = 100
 AGGS_VALUE_SIZE = 1400
+# Fail searches that hold more than their endpoint role needs,
+# see QUERY_PLANS in datasets/generic/queries.py
+VERIFY_QUERY_PLANS = TESTING
+# Geolocation requests with a zoom level below GEO_CLUSTER_MAX_ZOOM get
+# the locations grouped in cells, unless at most GEO_CLUSTER_MIN_POINTS
+# locations are selected
+GEO_CLUSTER_MAX_ZOOM = int(os.getenv('GEO_CLUSTER_MAX_ZOOM', '16'))
+GEO_CLUSTER_MIN_POINTS = int(os.getenv('GEO_CLUSTER_MIN_POINTS', '1000'))
+# The most cells a clustered response holds, the cells with the fewest
+# locations are left out of a larger grid and the response is truncated
+GEO_CLUSTER_MAX_CELLS = MAX_SEARCH_ITEMS
+# Decimals of the coordinates in geojson geolocation responses, 5 is ~1m
+GEOJSON_PRECISION = 5
+# Extra terms buckets requested above the cardinality recorded at index
+# time, covering the error of the recorded count
+AGGS_SIZE_MARGIN = 0.1
+# Seconds the index metadata (e.g. facet statistics) is cached per worker
+INDEX_META_TTL = int(os.getenv('INDEX_META_TTL', '60'))
 DOWNLOAD_BATCH = 900
+# Store the CSV line of every document in the index, so CSV exports
+# only concatenate them, see ImportIndexTask.export_view
+INDEX_EXPORT_ROWS = os.getenv('INDEX_EXPORT_ROWS', 'true').lower() == 'true'
+# Prebuilt exports, see datasets/generic/prebuilt.py. The index build
+# writes them, so this should be on a volume the web workers can read.
+PREBUILT_EXPORT_DIR = os.getenv(
+    'PREBUILT_EXPORT_DIR',
+    os.path.join(tempfile.gettempdir(), 'dataselectie_exports'))
+PREBUILT_EXPORT_COMPRESSLEVEL = 6
+if TESTING:
+    PREBUILT_EXPORT_DIR = tempfile.mkdtemp(prefix='dataselectie_exports_')
+# Compression of streamed exports, see datasets/generic/compression.py
+EXPORT_GZIP_LEVEL = int(os.getenv('EXPORT_GZIP_LEVEL', '6'))
+EXPORT_BROTLI_QUALITY = int(os.getenv('EXPORT_BROTLI_QUALITY', '5'))
+# Background exports, see datasets/generic/export_jobs.py. The directory
+# should be on a volume shared by all web workers. With 0 workers a
+# job runs in the request that starts it.
+EXPORT_JOB_DIR = os.getenv(
+    'EXPORT_JOB_DIR',
+    os.path.join(tempfile.gettempdir(), 'dataselectie_export_jobs'))
+EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', '2'))
+# Seconds a finished export is reused for identical requests
+EXPORT_JOB_TTL = int(os.getenv('EXPORT_JOB_TTL', '3600'))
+# Seconds after which a job that stopped reporting progress is restarted,
+# a job whose process on this host died fails right away
+EXPORT_JOB_STALE = 300
+if TESTING:
+    EXPORT_JOB_DIR = tempfile.mkdtemp(prefix='dataselectie_export_jobs_')
+    EXPORT_JOB_WORKERS = 0
+# Seconds a broken off resumable export can be continued, see
+# datasets/generic/resumable.py
+EXPORT_RESUME_TTL = int(os.getenv('EXPORT_RESUME_TTL', '86400'))
+# The checkpoints of resumable exports, apart from the search results
+# so exports do not push them out. On a volume shared by all workers.
+CACHES['export_resume'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.getenv(
+        'EXPORT_RESUME_DIR',
+        os.path.join(tempfile.gettempdir(), 'dataselectie_resume')),
+    'TIMEOUT': EXPORT_RESUME_TTL,
+    'OPTIONS': {'MAX_ENTRIES': 100000},
+}
+if TESTING:
+    CACHES['export_resume']['LOCATION'] = tempfile.mkdtemp(
+        prefix='dataselectie_resume_')
+# Rows per second of an export until exports of the index were measured,
+# see datasets/generic/preflight.py
+EXPORT_ROWS_PER_SECOND = int(os.getenv('EXPORT_ROWS_PER_SECOND', '5000'))
+# Admission control, see datasets/generic/admission.py. Slots per lane are
+# shared by all workers on the host, 0 slots does not limit the lane.
+# Requests wait at most timeout seconds for a slot, then get a 429.
+ADMISSION_DIR = os.getenv(
+    'ADMISSION_DIR', os.path.join(tempfile.gettempdir(), 'dataselectie_admission'))
+ADMISSION_LANES = {
+    'interactive': {
+        'slots': int(os.getenv('ADMISSION_INTERACTIVE_SLOTS', '16')),
+        'timeout': 2,
+    },
+    'geolocation': {
+        'slots': int(os.getenv('ADMISSION_GEOLOCATION_SLOTS', '8')),
+        'timeout': 5,
+    },
+    'export': {
+        'slots': int(os.getenv('ADMISSION_EXPORT_SLOTS', '4')),
+        'timeout': 10,
+    },
+}
+ADMISSION_RETRY_AFTER = 10
+# A request takes an extra slot per this many points of its shape
+# polygon and per this many hits up to its page (page * size)
+ADMISSION_SHAPE_POINTS_PER_SLOT = 100
+ADMISSION_WINDOW_PER_SLOT = 2500
+if TESTING:
+    ADMISSION_DIR = tempfile.mkdtemp(prefix='dataselectie_admission_')
+# Slices of the scroll an export reads at once, each by its own thread.
+# Should not exceed ELASTIC_POOL_SIZE.
+EXPORT_SLICES = int(os.getenv('EXPORT_SLICES', '4'))
 
 # Batch processing
 BATCH_SETTINGS = {
@@ -13,3 +13,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "dataselectie.settings")
 
 application = get_wsgi_application()
+
+# Warm up the shared Elasticsearch client in every worker. Under uwsgi
+# the application is loaded before the workers are forked, so the
+# warm-up has to run after the fork.
+from datasets.generic.elastic import warm_up  # noqa: E402
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    warm_up()
+else:
+    postfork(warm_up)
@@ -5,6 +5,8 @@ from django.conf import settings
 from . import models
 from ..generic import index
 from . import documents
+from . import queries
+from . import views
 
 log = logging.getLogger(__name__)
 
@@ -57,6 +59,8 @@ class IndexDsBagTask(index.ImportIndexTask):
         )
     )
 
+    export_view = views.BagCSV
+
     def convert(self, obj):
         return documents.doc_from_nummeraanduiding(obj)
 
@@ -67,3 +71,32 @@ class BuildIndexDsBagJob(object):
     @staticmethod
     def tasks():
         return [IndexDsBagTask()]
+
+
+class FacetStatsDsBAGTask(index.FacetStatsTask):
+    index = settings.ELASTIC_INDICES['DS_BAG_INDEX']
+    facets = queries.FACETS
+
+
+class ExportStatsDsBAGTask(index.ExportStatsTask):
+    view = views.BagCSV
+
+
+class FacetStatsIndexDsBAGJob(object):
+    name = "Collect facet and export statistics of the BAG search-index"
+
+    @staticmethod
+    def tasks():
+        return [FacetStatsDsBAGTask(), ExportStatsDsBAGTask()]
+
+
+class PrebuiltExportDsBAGTask(index.PrebuiltExportTask):
+    view = views.BagCSV
+
+
+class PrebuiltExportIndexDsBAGJob(object):
+    name = "Write the prebuilt exports of the BAG search-index"
+
+    @staticmethod
+    def tasks():
+        return [PrebuiltExportDsBAGTask()]
@@ -82,6 +82,9 @@ class Nummeraanduiding(es.Document):
     bouwjaar = es.Keyword()
     type_woonobject = es.Keyword()
     ligging = es.Keyword()
+    # The line of the document in the CSV export, see
+    # ImportIndexTask.export_view
+    export_row = es.Keyword(index=False, doc_values=False)
 
     class Meta:
         doc_type = 'nummeraanduiding'
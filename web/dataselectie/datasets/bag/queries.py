@@ -11,110 +11,43 @@
 # Packages
 from django.conf import settings
 from ..generic.queries import create_query
+from ..generic.queries import create_aggs as create_facet_aggs
 
 
-def meta_q(query: str, add_aggs=True, sort=True) -> dict:
+def meta_q(query: str, add_aggs=True, sort=True, facets=None) -> dict:
     # @TODO change to setting
     if add_aggs:
-        aggs = create_aggs()
+        aggs = create_aggs(facets)
     else:
         aggs = None
-    sort = {
+    sort_values = {
         'sort': {
             '_openbare_ruimte_naam': {"order": "asc"},
             'huisnummer': {"order": "asc"},
             'huisletter': {"order": "asc"},
             'huisnummer_toevoeging': {"order": "asc"}
         }
-    }
+    } if sort else None
 
-    return create_query(query, aggs, sort, qtype='nummeraanduiding')
+    return create_query(
+        query, aggs, sort_values, qtype='nummeraanduiding')
 
 
-def create_aggs():
-    agg_size = settings.AGGS_VALUE_SIZE
-    aggs = {
-        'aggs': {
-            'postcode': {
-                'terms': {
-                    'field': 'postcode',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                },
-            },
-            'openbare_ruimte': {
-                'terms': {
-                    'field': 'naam',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-            'buurtcombinatie_naam': {
-                'terms': {
-                    'field': 'buurtcombinatie_naam',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                },
-            },
-            'buurtcombinatie_code': {
-                'terms': {
-                    'field': 'buurtcombinatie_code',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                },
-            },
-            'buurt_code': {
-                'terms': {
-                    'field': 'buurt_code',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                },
-            },
-            'buurt_naam': {
-                'terms': {
-                    'field': 'buurt_naam',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                },
-            },
-            'ggw_naam': {
-                'terms': {
-                    'field': 'ggw_naam',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-            'ggw_code': {
-                'terms': {
-                    'field': 'ggw_code',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-            'stadsdeel_naam': {
-                'terms': {
-                    'field': 'stadsdeel_naam',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-            'stadsdeel_code': {
-                'terms': {
-                    'field': 'stadsdeel_code',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-        }
-    }
-    # Adding count aggregations
-    count_aggs = {}
-    for key, aggregatie in aggs['aggs'].items():
-        count_aggs[f'{key}_count'] = {
-            'cardinality' : {
-                'field' : aggregatie['terms']['field'],
-                'precision_threshold': 1000
-            }
-        }
-    aggs['aggs'].update(count_aggs)
-    return aggs
+# Facet name: elastic field
+FACETS = {
+    'postcode': 'postcode',
+    'openbare_ruimte': 'naam',
+    'buurtcombinatie_naam': 'buurtcombinatie_naam',
+    'buurtcombinatie_code': 'buurtcombinatie_code',
+    'buurt_code': 'buurt_code',
+    'buurt_naam': 'buurt_naam',
+    'ggw_naam': 'ggw_naam',
+    'ggw_code': 'ggw_code',
+    'stadsdeel_naam': 'stadsdeel_naam',
+    'stadsdeel_code': 'stadsdeel_code',
+}
+
+
+def create_aggs(facets=None):
+    return create_facet_aggs(
+        FACETS, facets, settings.ELASTIC_INDICES['DS_BAG_INDEX'])
@@ -1,14 +1,17 @@
 # Python
+import struct
 from unittest import skip
 from urllib.parse import urlencode
 
 from django.conf import settings
 from django.core.management import call_command
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from elasticsearch import Elasticsearch
 
-from datasets.bag import models, views
+from datasets.bag import batch, models, queries, views
 from datasets.bag.tests import fixture_utils
+from datasets.generic import index_meta, prebuilt, views_mixins
+from datasets.generic.queries import QueryPlanError, verify_plan
 from datasets.hr.tests.factories import create_hr_data
 
 
@@ -81,6 +84,159 @@ class DataselectieApiTest(ESTestCase):
             self.assertGreaterEqual(sortcriterium, previous)
             previous = sortcriterium
 
+    def test_cursor_pagination_dataselectie_bag(self):
+        """
+        Walk all records with search_after cursors and compare
+        with a single page of all records
+        """
+        response = self.client.get(
+            '/dataselectie/bag/?{}'.format(urlencode({'size': 100})))
+        expected = [o['landelijk_id'] for o in response.json()['object_list']]
+
+        found = []
+        q = {'size': 3}
+        while True:
+            response = self.client.get(
+                '/dataselectie/bag/?{}'.format(urlencode(q)))
+            self.assertEqual(response.status_code, 200)
+            res = response.json()
+            found.extend(o['landelijk_id'] for o in res['object_list'])
+            if 'next' not in res:
+                break
+            q['cursor'] = res['next']
+
+        self.assertEqual(found, expected)
+
+    def test_invalid_cursor_dataselectie_bag(self):
+        response = self.client.get(
+            '/dataselectie/bag/?{}'.format(urlencode({'cursor': 'nonsense'})))
+        self.assertEqual(response.status_code, 400)
+
+    def test_selected_aggs_dataselectie_bag(self):
+        q = {'page': 1, 'aggs': 'postcode,buurt_naam'}
+        response = self.client.get(
+            '/dataselectie/bag/?{}'.format(urlencode(q)))
+        self.assertEqual(response.status_code, 200)
+        res = response.json()
+        self.assertEqual(
+            set(res['aggs_list'].keys()), {'postcode', 'buurt_naam'})
+        self.assertEqual(
+            res['object_count'], models.Nummeraanduiding.objects.count())
+
+        q = {'page': 1, 'aggs': 'none'}
+        response = self.client.get(
+            '/dataselectie/bag/?{}'.format(urlencode(q)))
+        self.assertEqual(response.status_code, 200)
+        res = response.json()
+        self.assertEqual(res['aggs_list'], {})
+        self.assertEqual(
+            res['object_count'], models.Nummeraanduiding.objects.count())
+
+    def test_planned_aggs_dataselectie_bag(self):
+        """
+        Facets with known cardinality are complete and counted
+        from their buckets
+        """
+        cardinality = index_meta.facet_cardinality(
+            settings.ELASTIC_INDICES['DS_BAG_INDEX'])
+        self.assertIn('stadsdeel_naam', cardinality)
+
+        query = queries.meta_q(None)
+        self.assertNotIn('stadsdeel_naam_count', query['aggs'])
+
+        response = self.client.get('/dataselectie/bag/')
+        self.assertEqual(response.status_code, 200)
+        stadsdeel_naam = response.json()['aggs_list']['stadsdeel_naam']
+        self.assertEqual(
+            stadsdeel_naam['doc_count'], cardinality['stadsdeel_naam'])
+        self.assertEqual(
+            len(stadsdeel_naam['buckets']), cardinality['stadsdeel_naam'])
+
+    def test_facet_stats_generation_dataselectie_bag(self):
+        """
+        Test collecting the facet statistics starts a new generation
+        """
+        index = settings.ELASTIC_INDICES['DS_BAG_INDEX']
+        url = '/dataselectie/bag/?{}'.format(urlencode({'page': 1}))
+        etag = self.client.get(url)['ETag']
+        generation = index_meta.generation(index)
+
+        batch.FacetStatsDsBAGTask().execute()
+        self.assertNotEqual(index_meta.generation(index), generation)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_dataselectie_bag(self):
+        url = '/dataselectie/bag/?{}'.format(urlencode({'page': 1}))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(
+            '/dataselectie/bag/?{}'.format(urlencode({'page': 2})),
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_gzip_dataselectie_bag(self):
+        """
+        Test the weak ETag of a gzipped response is matched
+        """
+        url = '/dataselectie/bag/?{}'.format(urlencode({'page': 1}))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Only the W/ prefix makes an ETag weak
+        self.assertTrue(views_mixins.etag_matches('"W1/"', 'W/"W1/"'))
+        self.assertFalse(views_mixins.etag_matches('"W1/"', '"W1"'))
+        self.assertFalse(views_mixins.etag_matches('W/"1"', '"W/1"'))
+
+    def test_unknown_generation_dataselectie_bag(self):
+        """
+        Test nothing is cached or tagged without an index generation
+        """
+        self.assertIsNone(index_meta.generation('ds_bag_unknown'))
+
+        _request, view = prebuilt.setup_view(views.BagSearch, {'page': 1})
+        self.assertTrue(view.cache_key('hits'))
+        indices = dict(settings.ELASTIC_INDICES, DS_BAG_INDEX='ds_bag_unknown')
+        with override_settings(ELASTIC_INDICES=indices):
+            self.assertIsNone(view.cache_key('hits'))
+            self.assertIsNone(view.etag())
+
+    def test_fields_dataselectie_bag(self):
+        response = self.client.get('/dataselectie/bag/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ligging', response.json()['object_list'][0])
+
+        q = {'fields': 'landelijk_id,postcode'}
+        response = self.client.get(
+            '/dataselectie/bag/?{}'.format(urlencode(q)))
+        self.assertEqual(response.status_code, 200)
+        for item in response.json()['object_list']:
+            self.assertLessEqual(set(item), {'landelijk_id', 'postcode'})
+
+        q = {'fields': 'nonsense'}
+        response = self.client.get(
+            '/dataselectie/bag/?{}'.format(urlencode(q)))
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_aggs_dataselectie_bag(self):
+        response = self.client.get(
+            '/dataselectie/bag/?{}'.format(urlencode({'aggs': 'nonsense'})))
+        self.assertEqual(response.status_code, 400)
+
     def test_get_dataselectie_bag_stadsdeel_naam(self):
         """
         Test the elastic while querying on field `stadsdeel_naam` top-down
@@ -245,5 +401,115 @@ class DataselectieApiTest(ESTestCase):
             res['object_count'], models.Nummeraanduiding.objects.count())
         self.assertNotIn('aggs_list', res)
 
+    def test_get_dataselectie_geolocation_formats(self):
+        """
+        Test the compact geolocation formats hold the same points
+        """
+        response = self.client.get(
+            '/dataselectie/bag/geolocation/', {'format': 'columns'})
+        self.assertEqual(response.status_code, 200)
+        columns = response.json()
+        count = len(columns['ids'])
+        self.assertEqual(
+            columns['object_count'], models.Nummeraanduiding.objects.count())
+        self.assertEqual(len(columns['lons']), count)
+        self.assertEqual(len(columns['lats']), count)
+
+        response = self.client.get(
+            '/dataselectie/bag/geolocation/', {'format': 'binary'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        (binary_count,) = struct.unpack_from('<I', response.content)
+        self.assertEqual(binary_count, count)
+        ids = response.content[4 + 8 * count:].decode('utf-8')
+        self.assertEqual(ids.split('\n') if count else [], columns['ids'])
+
+        response = self.client.get(
+            '/dataselectie/bag/geolocation/', {'format': 'geojson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['features']), count)
+
+        response = self.client.get(
+            '/dataselectie/bag/geolocation/', {'format': 'svg'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_dataselectie_geolocation_clusters(self):
+        """
+        Test zoomed out geolocation groups the locations in cells
+        """
+        total_count = models.Nummeraanduiding.objects.count()
+        response = self.client.get(
+            '/dataselectie/bag/geolocation/', {'zoom': 9})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('cluster_list', response.json())
+
+        with override_settings(GEO_CLUSTER_MIN_POINTS=0):
+            response = self.client.get(
+                '/dataselectie/bag/geolocation/', {'zoom': 8})
+        self.assertEqual(response.status_code, 200)
+        res = response.json()
+        self.assertEqual(res['object_count'], total_count)
+        # Locations without a centroid are in no cell
+        self.assertLessEqual(
+            sum(cell['count'] for cell in res['cluster_list']), total_count)
+
+        response = self.client.get(
+            '/dataselectie/bag/geolocation/', {'bbox': '5,52,4,53'})
+        self.assertEqual(response.status_code, 400)
+
+        # Binary buffers hold no cluster counts
+        response = self.client.get(
+            '/dataselectie/bag/geolocation/', {'format': 'binary', 'zoom': 8})
+        self.assertEqual(response.status_code, 400)
+        with override_settings(GEO_CLUSTER_MIN_POINTS=0):
+            response = self.client.get(
+                '/dataselectie/bag/geolocation/',
+                {'format': 'columns', 'zoom': 8})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(response.json()['counts']), len(res['cluster_list']))
+
+    def test_get_dataselectie_geolocation_clusters_truncated(self):
+        """
+        Test a grid with more cells than allowed is marked truncated
+        """
+        url = '/dataselectie/bag/geolocation/'
+        with override_settings(GEO_CLUSTER_MIN_POINTS=0):
+            res = self.client.get(url, {'zoom': 15}).json()
+        self.assertFalse(res['truncated'])
+        cells = len(res['cluster_list'])
+
+        with override_settings(
+                GEO_CLUSTER_MIN_POINTS=0, GEO_CLUSTER_MAX_CELLS=1):
+            res = self.client.get(url, {'zoom': 15, 'format': 'geojson'})
+        res = res.json()
+        self.assertEqual(res['truncated'], cells > 1)
+        self.assertEqual(len(res['features']), min(cells, 1))
+
+    def test_get_dataselectie_tiles(self):
+        """
+        Test the selection as vector tiles
+        """
+        response = self.client.get('/dataselectie/bag/tiles/0/0/0.pbf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        # A tile with points has a layer
+        if models.Nummeraanduiding.objects.count():
+            self.assertTrue(response.content)
+
+        response = self.client.get('/dataselectie/bag/tiles/1/2/0.pbf')
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_plans(self):
+        """
+        Test geolocation and export queries have no aggs or sort
+        """
+        verify_plan(
+            views.BagGeoLocationSearch().elastic_query(''), 'geolocation')
+        verify_plan(views.BagCSV().elastic_query(''), 'export')
+        with self.assertRaises(QueryPlanError):
+            verify_plan(queries.meta_q(''), 'geolocation')
+
     def tearDown(self):
         pass
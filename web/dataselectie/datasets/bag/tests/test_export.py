@@ -1,10 +1,21 @@
+# Python
+import gzip
+import json
+import subprocess
+import sys
+import threading
+import time
+
 # Packages
 from django.conf import settings
+from django.contrib.gis.geos import Point
 from django.core.management import call_command
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from elasticsearch import Elasticsearch
 
 from datasets.bag.tests import fixture_utils
+from datasets.bag.views import BagCSV
+from datasets.generic import admission, columnar, export_jobs, prebuilt
 
 
 class ESTestCase(TestCase):
@@ -59,3 +70,312 @@ class DataselectieExportTest(ESTestCase):
         res = res.split('\r\n')
         # 11 lines: headers + 10 items
         self.assertEqual(len(res), 11)
+
+    def test_sliced_export_bag(self):
+        """
+        Test a sliced export has the rows of a single scroll
+        """
+        exports = []
+        for slices in (1, 3):
+            with override_settings(EXPORT_SLICES=slices):
+                response = self.client.get('/dataselectie/bag/export/')
+                self.assertEqual(response.status_code, 200)
+                res = b''.join(response.streaming_content).decode('utf-8')
+            exports.append(res.strip().split('\r\n'))
+        single, sliced = exports
+        self.assertEqual(single[0], sliced[0])
+        self.assertEqual(sorted(single[1:]), sorted(sliced[1:]))
+
+    def test_prebuilt_export_bag(self):
+        """
+        Test the unfiltered export is served from the prebuilt file
+        """
+        response = self.client.get('/dataselectie/bag/export/')
+        streamed = b''.join(response.streaming_content)
+
+        response = self.client.get(
+            '/dataselectie/bag/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        compressed = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(compressed))
+        self.assertEqual(
+            sorted(gzip.decompress(compressed).split(b'\r\n')),
+            sorted(streamed.split(b'\r\n')))
+
+        response = self.client.get(
+            '/dataselectie/bag/export/', {'format': 'csv'},
+            HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), compressed)
+
+        response = self.client.get(
+            '/dataselectie/bag/export/', HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), compressed[10:])
+
+    def test_compressed_export_bag(self):
+        """
+        Test a streamed export is compressed when the client accepts it
+        """
+        url = '/dataselectie/bag/export/?postcode=1012AB'
+        response = self.client.get(url)
+        streamed = b''.join(response.streaming_content)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), streamed)
+
+    def test_ndjson_export_bag(self):
+        """
+        Test the typed export has a JSON object per row
+        """
+        response = self.client.get(
+            '/dataselectie/bag/export/', {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 10)
+        for row in rows:
+            self.assertIsInstance(row['huisnummer'], int)
+            if row['geometrie_wgs_lat'] is not None:
+                self.assertIsInstance(row['geometrie_wgs_lat'], float)
+
+        response = self.client.get(
+            '/dataselectie/bag/export/', {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_typed_value_malformed(self):
+        """
+        Test a value that does not fit the type of its column is left
+        out, instead of breaking off the export
+        """
+        self.assertIsNone(columnar.typed_value(['1', '2'], 'integer'))
+        self.assertIsNone(columnar.typed_value('n.v.t.', 'float'))
+        self.assertIsNone(columnar.typed_value('2019-13-45', 'date'))
+        self.assertEqual(columnar.typed_value('3', 'integer'), 3)
+
+    def test_export_projection_bag(self):
+        """
+        Test the batched projection gives the RD coordinates of
+        every located row, also when rows span several batches
+        """
+        with override_settings(DOWNLOAD_BATCH=3):
+            response = self.client.get(
+                '/dataselectie/bag/export/', {'format': 'ndjson'})
+            rows = [
+                json.loads(line) for line in
+                b''.join(response.streaming_content).decode('utf-8')
+                .splitlines()]
+        located = [row for row in rows if row['geometrie_wgs_lat'] is not None]
+        self.assertTrue(located)
+        for row in located:
+            point = Point(
+                row['geometrie_wgs_lon'], row['geometrie_wgs_lat'], srid=4326)
+            point.transform(28992)
+            self.assertEqual(row['geometrie_rd_x'], int(point.x))
+            self.assertEqual(row['geometrie_rd_y'], int(point.y))
+
+    def test_export_rows_bag(self):
+        """
+        Test the CSV export is made of the lines stored in the index,
+        and the search does not return them
+        """
+        hits = Elasticsearch(hosts=settings.ELASTIC_SEARCH_HOSTS).search(
+            index=settings.ELASTIC_INDICES['DS_BAG_INDEX'],
+            body={'size': 100})['hits']['hits']
+        sources = [hit['_source'] for hit in hits]
+        rows = [source.pop('export_row') for source in sources]
+        self.assertEqual(BagCSV().render_rows(sources), rows)
+
+        response = self.client.get('/dataselectie/bag/export/')
+        lines = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(
+            sorted(lines.split('\r\n')[1:-1]),
+            sorted(row[:-2] for row in rows))
+
+        response = self.client.get('/dataselectie/bag/')
+        for item in response.json()['object_list']:
+            self.assertNotIn('export_row', item)
+
+    def test_export_job_bag(self):
+        """
+        Test a background export is written to a file, which
+        identical requests reuse
+        """
+        url = '/dataselectie/bag/export/'
+        streamed = b''.join(self.client.get(url).streaming_content)
+
+        response = self.client.get(url, {'async': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        job = response.json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['rows'], 10)
+        self.assertEqual(job['total'], 10)
+
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.json()['job_id'], job['job_id'])
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        response = self.client.get(
+            job['download_url'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            sorted(gzip.decompress(
+                b''.join(response.streaming_content)).split(b'\r\n')),
+            sorted(streamed.split(b'\r\n')))
+
+        response = self.client.get(url, {'async': 'true'})
+        self.assertEqual(response.json()['job_id'], job['job_id'])
+
+        response = self.client.get(f"{url}jobs/{'0' * 40}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_job_failed_bag(self):
+        """
+        Test a failed job shows a generic error, not its cause
+        """
+        url = '/dataselectie/bag/export/'
+        job = self.client.get(url, {'async': 'true'}).json()
+        export_jobs.run('datasets.bag.views.NoSuchView', [], job['job_id'])
+
+        response = self.client.get(job['status_url'])
+        self.assertEqual(response.status_code, 200)
+        status = response.json()
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['error'], export_jobs.FAILED_MESSAGE)
+
+    def test_export_job_lost_bag(self):
+        """
+        Test a job whose process died fails at once, and an
+        identical request starts it again
+        """
+        url = '/dataselectie/bag/export/'
+        job = self.client.get(url, {'async': 'true'}).json()
+
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        state = export_jobs.read_state(job['job_id'])
+        state['status'] = export_jobs.RUNNING
+        state['owner'] = dict(export_jobs.owner(), pid=process.pid)
+        export_jobs.write_state(state)
+
+        status = self.client.get(job['status_url']).json()
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['error'], export_jobs.FAILED_MESSAGE)
+
+        status = self.client.get(url, {'async': 'true'}).json()
+        self.assertEqual(status['job_id'], job['job_id'])
+        self.assertEqual(status['status'], 'done')
+
+    def test_export_admission_bag(self):
+        """
+        Test exports wait for a free slot and get a 429 when there
+        is none, and too large selections are rejected
+        """
+        lanes = dict(settings.ADMISSION_LANES)
+        lanes['export'] = {'slots': 1, 'timeout': 0.1}
+        with override_settings(ADMISSION_LANES=lanes):
+            url = '/dataselectie/bag/export/'
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+
+            b''.join(first.streaming_content)
+            first.close()
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+            shape = json.dumps(
+                [[4.9, 52.37]] * settings.ADMISSION_SHAPE_POINTS_PER_SLOT)
+            response = self.client.get(url, {'shape': shape})
+            self.assertEqual(response.status_code, 400)
+
+    def test_export_job_admission_bag(self):
+        """
+        Test a job takes the export slots: it stays queued while they
+        are taken, and fails when its selection is too large
+        """
+        url = '/dataselectie/bag/export/'
+        lanes = dict(settings.ADMISSION_LANES)
+        lanes['export'] = {'slots': 1, 'timeout': 0.1}
+        with override_settings(ADMISSION_LANES=lanes):
+            _request, view = prebuilt.setup_view(BagCSV, {})
+            job_id = view.cache_key(
+                'export_job', (export_jobs.ASYNC_PARAMETER,))
+            ticket = admission.admit('export')
+            responses = []
+            job = threading.Thread(target=lambda: responses.append(
+                Client().get(url, {'async': 'true'})))
+            job.start()
+            try:
+                time.sleep(1)
+                self.assertTrue(job.is_alive())
+                response = self.client.get(f'{url}jobs/{job_id}/')
+                self.assertEqual(response.status_code, 202)
+                self.assertEqual(response.json()['status'], 'queued')
+            finally:
+                ticket.close()
+                job.join(60)
+            self.assertEqual(responses[0].json()['status'], 'done')
+
+            shape = json.dumps(
+                [[4.9, 52.37]] * settings.ADMISSION_SHAPE_POINTS_PER_SLOT)
+            response = self.client.get(url, {'async': 'true', 'shape': shape})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['status'], 'failed')
+
+    def test_export_resumable_bag(self):
+        """
+        Test a resumable export continues from the requested row,
+        unless the index changed since
+        """
+        url = '/dataselectie/bag/export/'
+        with override_settings(DOWNLOAD_BATCH=3):
+            response = self.client.get(url, {'resumable': 'true'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Accept-Ranges'], 'rows')
+            lines = b''.join(response.streaming_content).split(b'\r\n')
+            # The header, 10 rows and the empty last line
+            self.assertEqual(len(lines), 12)
+
+            resumed = self.client.get(
+                url, {'resumable': 'true'}, HTTP_RANGE='rows=7-',
+                HTTP_IF_RANGE=response['ETag'])
+            self.assertEqual(resumed.status_code, 206)
+            self.assertEqual(resumed['Content-Range'], 'rows 7-*/*')
+            self.assertEqual(
+                b''.join(resumed.streaming_content).split(b'\r\n'),
+                lines[8:])
+
+            restarted = self.client.get(
+                url, {'resumable': 'true'}, HTTP_RANGE='rows=7-',
+                HTTP_IF_RANGE='"an earlier index"')
+            self.assertEqual(restarted.status_code, 200)
+            self.assertEqual(
+                b''.join(restarted.streaming_content).split(b'\r\n'), lines)
+
+    def test_export_preflight_bag(self):
+        """
+        Test the preflight estimates the rows and bytes of the export
+        from the width of the lines measured when the index was built
+        """
+        url = '/dataselectie/bag/export/'
+        response = self.client.get(f'{url}preflight/')
+        self.assertEqual(response.status_code, 200)
+        estimate = response.json()
+        self.assertEqual(estimate['format'], 'csv')
+        self.assertEqual(estimate['rows'], 10)
+        self.assertIsNotNone(estimate['seconds'])
+
+        exported = b''.join(self.client.get(url).streaming_content)
+        self.assertAlmostEqual(estimate['bytes'], len(exported), delta=1)
@@ -7,5 +7,12 @@ from . import views
 urlpatterns = (
     url(r'^$', views.BagSearch.as_view()),
     url(r'^export/$', views.BagCSV.as_view()),
+    url(r'^export/preflight/$', views.BagCSV.as_view(),
+        {'preflight': True}),
+    url(r'^export/jobs/(?P<job_id>[0-9a-f]{40})/$', views.BagCSV.as_view()),
+    url(r'^export/jobs/(?P<job_id>[0-9a-f]{40})/download/$',
+        views.BagCSV.as_view(), {'download': True}),
     url(r'^geolocation/$', views.BagGeoLocationSearch.as_view()),
+    url(r'^tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$',
+        views.BagTiles.as_view()),
 )
@@ -1,10 +1,13 @@
 # Packages
-from datasets.bag import models
-from datasets.bag.queries import meta_q
+from django.conf import settings
 
-from datasets.generic.views_mixins import CSVExportView, create_geometry_dict
+from datasets.bag import documents, models
+from datasets.bag.queries import meta_q, FACETS
+
+from datasets.generic.views_mixins import CSVExportView, create_geometry_dicts
 from datasets.generic.views_mixins import GeoLocationSearchView
 from datasets.generic.views_mixins import TableSearchView
+from datasets.generic.views_mixins import VectorTileView
 
 
 class BagBase(object):
@@ -25,16 +28,36 @@ class BagBase(object):
         'openbare_ruimte': 'naam',
     }
     raw_fields = []
+    sort_tiebreaker = 'landelijk_id'
+    document = documents.Nummeraanduiding
+    facets = FACETS
+    # Anonymous data, proxies can share it
+    cache_control = {'public': True, 'max_age': settings.BAG_CACHE_MAX_AGE}
 
 
 class BagGeoLocationSearch(BagBase, GeoLocationSearchView):
     def elastic_query(self, query):
-        return meta_q(query, False)
+        return meta_q(query, False, False)
+
+
+class BagTiles(BagBase, VectorTileView):
+    layer = 'nummeraanduiding'
+
+    def elastic_query(self, query):
+        return meta_q(query, False, False)
 
 
 class BagSearch(BagBase, TableSearchView):
+    # Fields that are only indexed for the CSV export
+    default_source = {
+        'exclude': [
+            'gebruiksdoel', 'toegang', 'panden', 'pandnaam', 'bouwjaar',
+            'type_woonobject', 'ligging', 'export_row',
+        ]
+    }
+
     def elastic_query(self, query):
-        return meta_q(query)
+        return meta_q(query, facets=self.requested_facets())
 
 
 class BagCSV(BagBase, CSVExportView):
@@ -94,13 +117,15 @@ class BagCSV(BagBase, CSVExportView):
 
     field_names = [h[0] for h in fields_and_headers]
     csv_headers = [h[1] for h in fields_and_headers]
+    prebuilt = True
+    # Not the public caching of BagBase, see CSVExportView
+    cache_control = CSVExportView.cache_control
 
     def elastic_query(self, query):
         return meta_q(query, False, False)
 
-    def item_data_update(self, item, request):
-        create_geometry_dict(item)
-        return item
+    def batch_data_update(self, items, request):
+        create_geometry_dicts(items, formatted=self.export_format == 'csv')
 
     def paginate(self, offset, q):
         if 'size' in q:
@@ -5,6 +5,8 @@ from django.conf import settings
 from datasets.brk import models
 
 from . import documents
+from . import queries
+from . import views
 from ..generic import index
 
 log = logging.getLogger(__name__)
@@ -76,6 +78,7 @@ class IndexBrkTask(index.ImportIndexTask):
         # batches
         .order_by('zakelijk_recht__id')
     )
+    export_view = views.BrkCSV
 
     def convert(self, obj: models.Eigendom):
         return documents.doc_from_eigendom(obj)
@@ -90,3 +93,20 @@ class BuildIndexBRKJob(object):
     @staticmethod
     def tasks():
         return [IndexBrkTask()]
+
+
+class FacetStatsDsBRKTask(index.FacetStatsTask):
+    index = settings.ELASTIC_INDICES['DS_BRK_INDEX']
+    facets = queries.FACETS
+
+
+class ExportStatsDsBRKTask(index.ExportStatsTask):
+    view = views.BrkCSV
+
+
+class FacetStatsIndexDsBRKJob(object):
+    name = "Collect facet and export statistics of the BRK search-index"
+
+    @staticmethod
+    def tasks():
+        return [FacetStatsDsBRKTask(), ExportStatsDsBRKTask()]
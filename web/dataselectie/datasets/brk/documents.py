@@ -107,6 +107,10 @@ class Eigendom(es.Document):
     sjt_postadres_buitenland = es.Keyword()
     sjt_postadres_postbus = es.Keyword()
 
+    # The line of the document in the CSV export, see
+    # ImportIndexTask.export_view
+    export_row = es.Keyword(index=False, doc_values=False)
+
     # def save(self, *args, **kwargs):
     #     """Fills a few dependant fields with data from other fields.
     #
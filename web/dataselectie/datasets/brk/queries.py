@@ -11,12 +11,13 @@
 # Packages
 from django.conf import settings
 from ..generic.queries import create_query
+from ..generic.queries import create_aggs as create_facet_aggs
 
 
-def meta_q(query: str, add_aggs=True, sort=True) -> dict:
+def meta_q(query: str, add_aggs=True, sort=True, facets=None) -> dict:
     # @TODO change to setting
     if add_aggs:
-        aggs = create_aggs()
+        aggs = create_aggs(facets)
     else:
         aggs = None
     sort_values = {
@@ -30,62 +31,17 @@ def meta_q(query: str, add_aggs=True, sort=True) -> dict:
     return create_query(query, aggs, sort_values, qtype='eigendom')
 
 
-def create_aggs():
-    agg_size = settings.AGGS_VALUE_SIZE
-    aggs = {
-        'aggs': {
-            'eigenaar_type': {
-                'terms': {
-                    'field': 'eigenaar_type',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-            'eigenaar_cat': {
-                'terms': {
-                    'field': 'eigenaar_cat',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-            'buurtcombinatie_naam': {
-                'terms': {
-                    'field': 'buurtcombinatie_naam',
-                    'size': agg_size,
-                     'order': {'_term': 'asc'},
-                },
-            },
-            'buurt_naam': {
-                'terms': {
-                    'field': 'buurt_naam',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                },
-            },
-            'ggw_naam': {
-                'terms': {
-                    'field': 'ggw_naam',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-            'stadsdeel_naam': {
-                'terms': {
-                    'field': 'stadsdeel_naam',
-                    'size': agg_size,
-                    'order': {'_term': 'asc'},
-                }
-            },
-        }
-    }
-    # Adding count aggregations
-    count_aggs = {}
-    for key, aggregatie in aggs['aggs'].items():
-        count_aggs[f'{key}_count'] = {
-            'cardinality' : {
-                'field' : aggregatie['terms']['field'],
-                'precision_threshold': 1000
-            }
-        }
-    aggs['aggs'].update(count_aggs)
-    return aggs
+# Facet name: elastic field
+FACETS = {
+    'eigenaar_type': 'eigenaar_type',
+    'eigenaar_cat': 'eigenaar_cat',
+    'buurtcombinatie_naam': 'buurtcombinatie_naam',
+    'buurt_naam': 'buurt_naam',
+    'ggw_naam': 'ggw_naam',
+    'stadsdeel_naam': 'stadsdeel_naam',
+}
+
+
+def create_aggs(facets=None):
+    return create_facet_aggs(
+        FACETS, facets, settings.ELASTIC_INDICES['DS_BRK_INDEX'])
@@ -1,3 +1,4 @@
+import gzip
 import json
 import logging
 # Python
@@ -8,12 +9,14 @@ from django.conf import settings
 from django.contrib.gis.geos import Polygon
 from django.core.management import call_command
 from django.test import Client, TestCase, tag, TransactionTestCase
+from django.test import override_settings
 from elasticsearch import Elasticsearch
 
 from datasets.bag.tests import fixture_utils as bag
 from datasets.brk.filters import modify_queryparams_for_shape
 from datasets.brk.tests import fixture_utils as brk
 from datasets.brk.tests.factories import create_brk_data
+from datasets.brk.views import BrkCSV
 # Project
 from datasets.generic.tests.authorization import AuthorizationSetup
 
@@ -333,6 +336,19 @@ class DataselectieApiTest(ESTestCase, AuthorizationSetup):
         self.assertEqual(agg_eigenaar_cat['buckets'][0]['key'], 'De staat')
         self.assertEqual(agg_eigenaar_cat['buckets'][0]['doc_count'], 1)
 
+    @tag('brk')
+    def test_api_search_conditional_unauthorized(self):
+        """
+        Test a conditional request is not answered without the scope
+        """
+        url = BRK_BASE_QUERY.format(urlencode({}))
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH='*', **self.header_auth_scope_hr_r)
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH='*', **self.header_auth_scope_brk_plus)
+        self.assertEqual(response.status_code, 304)
+
     @tag('brk')
     def test_api_search_with_shape(self):
         q = {'shape': "[[3.3135576333212353, 47.97476588287572],[3.3135390644506812, 47.975214773576475],[3.31420758007582, 47.97522724021333],[3.3142261429684208, 47.97477834935932]]"}
@@ -396,6 +412,72 @@ class DataselectieApiTest(ESTestCase, AuthorizationSetup):
         self.assertTrue('Amsterdam' in result[1])
         self.assertTrue('Postbus 123 1234AA Amsterdam' in result[1])
 
+    @tag('brk')
+    def test_export_rows_eigendommen(self):
+        """
+        Test the CSV export is made of the lines stored in the index
+        """
+        hits = Elasticsearch(hosts=settings.ELASTIC_SEARCH_HOSTS).search(
+            index=settings.ELASTIC_INDICES['DS_BRK_INDEX'],
+            body={'size': 100})['hits']['hits']
+        sources = [hit['_source'] for hit in hits]
+        rows = [source.pop('export_row') for source in sources]
+        self.assertEqual(BrkCSV().render_rows(sources), rows)
+
+        response = self.client.get(
+            BRK_EXPORT_QUERY, **self.header_auth_scope_brk_plus)
+        lines = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(lines.split('\r\n')[1:-1], [rows[0][:-2]])
+
+    @tag('brk')
+    def test_ndjson_export_eigendommen(self):
+        response = self.client.get(
+            BRK_EXPORT_QUERY.format(urlencode({'format': 'ndjson'})),
+            **self.header_auth_scope_brk_plus)
+        self.assertEqual(response.status_code, 200)
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['aanduiding'], 'ASD10 S 00012 G 0023')
+
+    @tag('brk')
+    def test_export_job_eigendommen(self):
+        response = self.client.get(
+            BRK_EXPORT_QUERY.format(urlencode({'async': 'true'})),
+            **self.header_auth_scope_brk_plus)
+        self.assertEqual(response.status_code, 200)
+        job = response.json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['rows'], 1)
+
+        # The job needs the scope of the export
+        response = self.client.get(
+            job['status_url'], **self.header_auth_scope_hr_r)
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(
+            job['download_url'], **self.header_auth_scope_brk_plus)
+        self.assertEqual(response.status_code, 200)
+        result = gzip.decompress(
+            b''.join(response.streaming_content)).decode('utf-8')
+        self.assertIn('ASD10 S 00012 G 0023', result)
+
+    @tag('brk')
+    def test_export_resumable_eigendommen(self):
+        url = BRK_EXPORT_QUERY.format(urlencode({'resumable': 'true'}))
+        with override_settings(DOWNLOAD_BATCH=1):
+            response = self.client.get(url, **self.header_auth_scope_brk_plus)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Accept-Ranges'], 'rows')
+            b''.join(response.streaming_content)
+
+            resumed = self.client.get(
+                url, HTTP_RANGE='rows=1-', HTTP_IF_RANGE=response['ETag'],
+                **self.header_auth_scope_brk_plus)
+            self.assertEqual(resumed.status_code, 206)
+            self.assertEqual(b''.join(resumed.streaming_content), b'')
+
 
 class FilterApiTest(ESTestCase, AuthorizationSetup):
 
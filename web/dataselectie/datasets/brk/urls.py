@@ -8,5 +8,10 @@ urlpatterns = (
     url(r'^$', views.BrkSearch.as_view()),
     url(r'^kot/$', views.BrkKotSearch.as_view()),
     url(r'^export/$', views.BrkCSV.as_view()),
+    url(r'^export/preflight/$', views.BrkCSV.as_view(),
+        {'preflight': True}),
+    url(r'^export/jobs/(?P<job_id>[0-9a-f]{40})/$', views.BrkCSV.as_view()),
+    url(r'^export/jobs/(?P<job_id>[0-9a-f]{40})/download/$',
+        views.BrkCSV.as_view(), {'download': True}),
     url(r'^geolocation/$', views.BrkGeoLocationSearch.as_view()),
 )
@@ -8,8 +8,8 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.status import HTTP_403_FORBIDDEN
 
-from datasets.brk import models, geo_models, filters, serializers
-from datasets.brk.queries import meta_q
+from datasets.brk import models, geo_models, filters, serializers, documents
+from datasets.brk.queries import meta_q, FACETS
 from datasets.generic.views_mixins import CSVExportView, stringify_item_value
 from datasets.generic.views_mixins import TableSearchView
 
@@ -96,6 +96,17 @@ class BrkBase(object):
     keyword_mapping = {
     }
     raw_fields = []
+    sort_tiebreaker = 'eigendom_id'
+    document = documents.Eigendom
+    authorization_scopes = (
+        authorization_levels.SCOPE_BRK_RS,
+        authorization_levels.SCOPE_BRK_RSN,
+    )
+    facets = FACETS
+
+    def check_permissions(self, request):
+        if not request.is_authorized_for(authorization_levels.SCOPE_BRK_RSN):
+            raise PermissionDenied("scope BRK/RSN required")
 
 
 class BrkAggBase(BrkBase):
@@ -248,26 +259,24 @@ class BrkGeoLocationSearch(BrkBase, generics.ListAPIView):
 
 
 class BrkSearch(BrkAggBase, TableSearchView):
-    def handle_request(self, request, *args, **kwargs):
-        if not request.is_authorized_for(authorization_levels.SCOPE_BRK_RSN):
-            raise PermissionDenied("scope BRK/RSN required")
-        return super().handle_request(request, *args, **kwargs)
+    default_source = {
+        "exclude": ["adressen", "export_row"]
+    }
 
     def elastic_query(self, query):
-        result = meta_q(query)
-        result.update({
-            "_source": {
-                "exclude": ["adressen"]
-            },
-        })
-        return result
+        return meta_q(query, facets=self.requested_facets())
 
 
 class BrkKotSearch(BrkAggBase, TableSearchView):
-    def handle_request(self, request, *args, **kwargs):
-        if not request.is_authorized_for(authorization_levels.SCOPE_BRK_RSN):
-            raise PermissionDenied("scope BRK/RSN required")
-        return super().handle_request(request, *args, **kwargs)
+    default_source = {
+        "include": [
+            "kadastraal_object_id",
+            "aanduiding",
+            "eerste_adres",
+        ]
+    }
+    # Used to remove duplicates in filter_data
+    required_fields = ('kadastraal_object_id',)
 
     def filter_data(self, elastic_data, request):
         """
@@ -285,17 +294,7 @@ class BrkKotSearch(BrkAggBase, TableSearchView):
         return elastic_data
 
     def elastic_query(self, query):
-        result = meta_q(query)
-        result.update({
-            "_source": {
-                "include": [
-                    "kadastraal_object_id",
-                    "aanduiding",
-                    "eerste_adres",
-                ]
-            },
-        })
-        return result
+        return meta_q(query, facets=self.requested_facets())
 
 
 class BrkCSV(BrkBase, CSVExportView):
@@ -341,16 +340,11 @@ class BrkCSV(BrkBase, CSVExportView):
         ('sjt_postadres_buitenland', 'Postadres buitenland'),
     )
 
-    def handle_request(self, request, *args, **kwargs):
-        if not request.is_authorized_for(authorization_levels.SCOPE_BRK_RSN):
-            raise PermissionDenied("scope BRK/RSN required")
-        return super().handle_request(request, *args, **kwargs)
-
     field_names = [h[0] for h in fields_and_headers]
     csv_headers = [h[1] for h in fields_and_headers]
 
     def elastic_query(self, query):
-        result = meta_q(query, False, True)
+        result = meta_q(query, False, False)
         result.update({
             "_source": {
                 "exclude": ["eerste_adres"]
@@ -0,0 +1,112 @@
+"""
+==================================================
+ Admission control
+--------------------------------------------------
+ Limits the elastic requests running at once per
+ lane: exports, geolocation and interactive
+ searches, see settings.ADMISSION_LANES. A request
+ takes one or more slots of its lane, depending on
+ its estimated cost, and waits at most the timeout
+ of the lane for them. A request that gets no
+ slots is answered with 429 Too Many Requests.
+
+ A slot is an exclusive lock on a file, so the
+ limits hold for all workers on the host, and the
+ slots of a worker that dies are released by the
+ operating system.
+==================================================
+"""
+# Python
+import fcntl
+import os
+import random
+import time
+
+# Packages
+from django.conf import settings
+
+# Seconds between two attempts to get the slots
+POLL_INTERVAL = 0.05
+
+
+class Saturated(Exception):
+    """
+    All slots of the lane stayed taken
+    """
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"Too many {lane} requests, retry after "
+                         f"{retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class TooCostly(Exception):
+    """
+    The request needs more slots than its lane has
+    """
+
+
+class Ticket(object):
+    """
+    The slots taken by a request. A streaming response closes
+    the ticket when it is done, see SingleDispatchMixin.dispatch.
+    """
+    def __init__(self, descriptors=()):
+        self.descriptors = list(descriptors)
+
+    def close(self):
+        for descriptor in self.descriptors:
+            os.close(descriptor)
+        self.descriptors = []
+
+
+def _slot_path(lane: str, slot: int) -> str:
+    return os.path.join(settings.ADMISSION_DIR, f'{lane}.{slot}.lock')
+
+
+def _try_take(lane: str, slots: int, cost: int) -> list:
+    """
+    Locks cost free slots of the lane, an empty list when there
+    are not enough free slots. Starts at a random slot, so the
+    first slots are not tried by every request.
+    """
+    taken = []
+    start = random.randrange(slots)
+    for offset in range(slots):
+        descriptor = os.open(
+            _slot_path(lane, (start + offset) % slots),
+            os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(descriptor)
+            continue
+        taken.append(descriptor)
+        if len(taken) == cost:
+            return taken
+    for descriptor in taken:
+        os.close(descriptor)
+    return []
+
+
+def admit(lane: str, cost: int = 1) -> Ticket:
+    """
+    Takes cost slots of the lane, waiting at most the timeout of
+    the lane. A lane without slots does not limit its requests.
+    """
+    config = settings.ADMISSION_LANES[lane]
+    slots = config['slots']
+    if not slots:
+        return Ticket()
+    if cost > slots:
+        raise TooCostly(
+            "The request is too large, narrow the selection down")
+
+    os.makedirs(settings.ADMISSION_DIR, exist_ok=True)
+    deadline = time.monotonic() + config['timeout']
+    while True:
+        taken = _try_take(lane, slots, cost)
+        if taken:
+            return Ticket(taken)
+        if time.monotonic() >= deadline:
+            raise Saturated(lane, settings.ADMISSION_RETRY_AFTER)
+        time.sleep(POLL_INTERVAL)
@@ -0,0 +1,65 @@
+"""
+==================================================
+ Two-tier search result cache
+--------------------------------------------------
+ Results are looked up in a small in-process LRU
+ cache first and then in a cache on disk that is
+ shared by all workers. Both tiers are Django
+ caches, see settings.CACHES for sizes and TTLs.
+
+ Every key contains the generation of the index,
+ see index_meta.py. Rebuilding an index gives it a
+ new generation, which makes all earlier entries
+ unreachable, so nothing has to be invalidated.
+ A worker picks up the new generation when its
+ cached index metadata expires, after at most
+ INDEX_META_TTL seconds, and serves the results of
+ the previous generation until then. Nothing is
+ cached while the generation of an index is
+ unknown, see ElasticSearchMixin.cache_key.
+
+ Only small results, pages of hits and facets, are
+ kept in the local tier. Large results such as
+ geolocations are only kept in the shared tier.
+==================================================
+"""
+# Python
+import hashlib
+import json
+
+# Packages
+from django.core.cache import caches
+
+LOCAL = 'search_local'
+SHARED = 'search_shared'
+# Vector tiles, on disk
+TILES = 'tiles'
+# Checkpoints of resumable exports, on disk
+RESUME = 'export_resume'
+
+
+def make_key(*parts) -> str:
+    """
+    Creates a cache key from json serializable parts
+    """
+    data = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def get(key: str, local=True):
+    """
+    Returns the cached value or None. A value found in the shared
+    tier is copied to the local tier, unless local is False.
+    """
+    value = caches[LOCAL].get(key) if local else None
+    if value is None:
+        value = caches[SHARED].get(key)
+        if value is not None and local:
+            caches[LOCAL].set(key, value)
+    return value
+
+
+def set(key: str, value, local=True):
+    if local:
+        caches[LOCAL].set(key, value)
+    caches[SHARED].set(key, value)
@@ -0,0 +1,165 @@
+"""
+==================================================
+ Columnar exports
+--------------------------------------------------
+ Writes batches of typed export columns as NDJSON,
+ Arrow IPC streams or Parquet. Values keep the
+ type of their elastic field: numbers stay numbers
+ and dates stay dates.
+
+ Arrow and Parquet need pyarrow, without it only
+ NDJSON is available.
+==================================================
+"""
+# Python
+import io
+import json
+from datetime import date, datetime
+
+# Packages
+from dateutil.parser import parse
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+INTEGER_TYPES = ('integer', 'long', 'short', 'byte')
+FLOAT_TYPES = ('float', 'double', 'half_float', 'scaled_float')
+
+
+def typed_value(value, type_name: str):
+    """
+    The value of an elastic field of the given type, None for
+    missing values and for values that do not fit the type, as
+    the export is already being sent. Lists of values in text
+    fields are joined.
+    """
+    if value is None or value == '':
+        return None
+    try:
+        if type_name in INTEGER_TYPES:
+            return int(value)
+        if type_name in FLOAT_TYPES:
+            return float(value)
+        if type_name == 'date':
+            if isinstance(value, datetime):
+                return value.date()
+            if isinstance(value, date):
+                return value
+            return parse(value).date()
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if type_name == 'boolean':
+        return bool(value)
+    if isinstance(value, list):
+        return ' | '.join(str(item) for item in value)
+    return str(value)
+
+
+class StreamSink(io.RawIOBase):
+    """
+    A write only file that hands out what was written since the
+    last take(). The position keeps counting, as the Parquet
+    writer uses it for the offsets in its footer.
+    """
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value)} is not JSON serializable")
+
+
+def write_ndjson(batches, fields: list, _types: dict):
+    """
+    One JSON object per row
+    """
+    for columns in batches:
+        rows = zip(*(columns[field] for field in fields))
+        yield ''.join(
+            json.dumps(dict(zip(fields, row)), default=_json_default,
+                       ensure_ascii=False) + '\n'
+            for row in rows)
+
+
+def arrow_schema(fields: list, types: dict):
+    def arrow_type(type_name):
+        if type_name in INTEGER_TYPES:
+            return pyarrow.int64()
+        if type_name in FLOAT_TYPES:
+            return pyarrow.float64()
+        if type_name == 'date':
+            return pyarrow.date32()
+        if type_name == 'boolean':
+            return pyarrow.bool_()
+        return pyarrow.string()
+
+    return pyarrow.schema([
+        pyarrow.field(field, arrow_type(types.get(field))) for field in fields])
+
+
+def _record_batch(columns: dict, schema):
+    return pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(columns[field.name], type=field.type)
+         for field in schema],
+        schema=schema)
+
+
+def write_arrow(batches, fields: list, types: dict):
+    """
+    An Arrow IPC stream with a record batch per batch
+    """
+    schema = arrow_schema(fields, types)
+    sink = StreamSink()
+    writer = pyarrow.ipc.new_stream(sink, schema)
+    for columns in batches:
+        writer.write_batch(_record_batch(columns, schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def write_parquet(batches, fields: list, types: dict):
+    """
+    A Parquet file with a row group per batch
+    """
+    schema = arrow_schema(fields, types)
+    sink = StreamSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    for columns in batches:
+        writer.write_table(
+            pyarrow.Table.from_batches([_record_batch(columns, schema)]))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+WRITERS = {
+    'ndjson': write_ndjson,
+    'arrow': write_arrow,
+    'parquet': write_parquet,
+}
@@ -0,0 +1,80 @@
+"""
+==================================================
+ Streaming compression
+--------------------------------------------------
+ Compresses a streamed response chunk by chunk.
+ Every chunk is flushed, so the client receives
+ each batch as soon as it is produced.
+
+ Brotli is used when the brotli package is
+ installed and the client accepts it.
+==================================================
+"""
+# Python
+import zlib
+
+# Packages
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def negotiate(accept_encoding: str):
+    """
+    The preferred content coding the Accept-Encoding header
+    allows, None when the response should not be compressed
+    """
+    accepted = set()
+    for coding in accept_encoding.split(','):
+        name, _, parameters = coding.strip().partition(';')
+        quality = parameters.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    for encoding in ENCODINGS:
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+def _encode(chunk) -> bytes:
+    return chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def compress_stream(chunks, encoding: str):
+    """
+    Compresses the chunks with the given content coding,
+    yielding the compressed data of every chunk
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=settings.EXPORT_BROTLI_QUALITY)
+        for chunk in chunks:
+            if not chunk:
+                continue
+            data = compressor.process(_encode(chunk)) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    # wbits 31 writes a gzip header and trailer
+    compressor = zlib.compressobj(
+        settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if not chunk:
+            continue
+        data = compressor.compress(_encode(chunk)) + \
+            compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
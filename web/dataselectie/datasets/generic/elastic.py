@@ -0,0 +1,162 @@
+"""
+==================================================
+ Shared Elasticsearch client
+--------------------------------------------------
+ Every worker process keeps a single client, and
+ with it a single keep-alive connection pool, that
+ is used by all views, exports and health checks.
+==================================================
+"""
+# Python
+import copy
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Packages
+from django.conf import settings
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import scan
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+# Hits passed at once from a slice reader to the consumer
+SLICE_BATCH = 500
+
+
+def get_client() -> Elasticsearch:
+    """
+    Returns the Elasticsearch client of the current process,
+    creating it on first use.
+
+    The client is bound to the pid that created it. When uwsgi
+    forks its workers after loading the application each worker
+    therefore starts its own pool instead of sharing sockets
+    with the master.
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = Elasticsearch(
+                    hosts=settings.ELASTIC_SEARCH_HOSTS,
+                    maxsize=settings.ELASTIC_POOL_SIZE,
+                    timeout=settings.ELASTIC_TIMEOUTS['default'],
+                    retry_on_timeout=True,
+                )
+                _client_pid = pid
+    return _client
+
+
+class TextDeserializer(object):
+    """
+    Passes response bodies on as text
+    """
+    def loads(self, s, mimetype=None):
+        return s
+
+
+def raw_transport(client: Elasticsearch):
+    """
+    The transport of the client with response bodies passed on as
+    text. It shares the connection pool of the client, so retries,
+    dead connections and the other hosts are handled the same way.
+    """
+    transport = copy.copy(client.transport)
+    transport.deserializer = TextDeserializer()
+    return transport
+
+
+def request_timeout(endpoint: str) -> float:
+    """
+    The request timeout (in seconds) for the given endpoint class
+    as configured in settings.ELASTIC_TIMEOUTS
+    """
+    return settings.ELASTIC_TIMEOUTS.get(
+        endpoint, settings.ELASTIC_TIMEOUTS['default'])
+
+
+def warm_up():
+    """
+    Creates the client and opens the first pooled connection so
+    the first request of a fresh worker does not pay for it.
+    """
+    try:
+        get_client().ping(request_timeout=request_timeout('health'))
+    except Exception:
+        log.exception("Elasticsearch warm-up failed")
+
+
+def sliced_scan(client: Elasticsearch, query: dict, index: str,
+                slices: int, **kwargs):
+    """
+    Like elasticsearch.helpers.scan, but reads the scroll in the
+    given number of slices, each by its own thread. Hits are
+    yielded in the order they arrive, so the query should not
+    be sorted. With one slice this is a plain scan.
+
+    Closing the generator stops the readers.
+    """
+    if slices <= 1:
+        yield from scan(client, query=query, index=index, **kwargs)
+        return
+
+    batches = queue.Queue(maxsize=slices * 2)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Gives up when the consumer has stopped reading
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def read_slice(slice_id: int):
+        hits = scan(
+            client, query=dict(query, slice={'id': slice_id, 'max': slices}),
+            index=index, **kwargs)
+        try:
+            batch = []
+            for hit in hits:
+                if stop.is_set():
+                    return
+                batch.append(hit)
+                if len(batch) == SLICE_BATCH:
+                    put(batch)
+                    batch = []
+            if batch:
+                put(batch)
+        except Exception as exc:
+            put(exc)
+        finally:
+            # Clears the scroll of this slice
+            hits.close()
+            put(done)
+
+    pool = ThreadPoolExecutor(max_workers=slices)
+    try:
+        for slice_id in range(slices):
+            pool.submit(read_slice, slice_id)
+        running = slices
+        while running:
+            item = batches.get()
+            if item is done:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield from item
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
@@ -0,0 +1,417 @@
+"""
+==================================================
+ Background exports
+--------------------------------------------------
+ An export requested with async=true is written
+ to a file by a pool of worker processes, so the
+ web worker is free again right away. The client
+ polls the status of the job and downloads the
+ file when it is done.
+
+ The id of a job is the cache key of the request,
+ see ElasticSearchMixin.cache_key, so identical
+ requests for the same index generation share a
+ job and its file for EXPORT_JOB_TTL seconds.
+ While the generation is unknown every request
+ gets a job of its own.
+
+ A job takes the slots of the export lane while
+ it runs, like a streamed export, see admission.py.
+ It stays queued while the lane is full, a
+ selection too large for the lane fails.
+
+ The state of every job is a small JSON file next
+ to the export, which all web workers can read.
+
+ Every web worker has its own pool of export
+ processes. The state of a job holds its owner,
+ the web worker that queued it and then the
+ process that runs it. A job whose owner on this
+ host died, when uwsgi recycled the worker or
+ the export process crashed, is failed right
+ away instead of after EXPORT_JOB_STALE seconds.
+==================================================
+"""
+# Python
+import functools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Packages
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.module_loading import import_string
+
+from datasets.generic import admission
+from datasets.generic import compression
+from datasets.generic import prebuilt
+
+log = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# The request parameter that asks for a background export
+ASYNC_PARAMETER = 'async'
+
+# The error of a failed job as shown to the client, the cause is logged
+FAILED_MESSAGE = 'The export failed, please try again later'
+
+# Seconds between two updates of the state of a running job
+PROGRESS_INTERVAL = 1
+
+# A job as answered to a request, the download of its file or its state
+Job = namedtuple('Job', ['state', 'download'])
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+
+
+def state_path(job_id: str) -> str:
+    return os.path.join(settings.EXPORT_JOB_DIR, f'{job_id}.json')
+
+
+def export_path(job_id: str, extension: str) -> str:
+    return os.path.join(settings.EXPORT_JOB_DIR, f'{job_id}.{extension}')
+
+
+def view_path(view) -> str:
+    """
+    The dotted path of the class of a view
+    """
+    return f'{type(view).__module__}.{type(view).__name__}'
+
+
+def read_state(job_id: str):
+    """
+    The state of a job, None when there is no such job
+    """
+    try:
+        with open(state_path(job_id)) as state_file:
+            return json.load(state_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_state(state: dict):
+    state['updated'] = time.time()
+    path = state_path(state['job_id'])
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as state_file:
+        json.dump(state, state_file)
+    os.replace(temp_path, path)
+
+
+def owner() -> dict:
+    """
+    The current process as the owner of a job
+    """
+    return {'host': socket.gethostname(), 'pid': os.getpid()}
+
+
+def owner_alive(state: dict) -> bool:
+    """
+    Whether the owner of a job still lives. Processes on other hosts
+    cannot be checked, their jobs only expire when they are stale.
+    """
+    job_owner = state.get('owner')
+    if not job_owner or job_owner['host'] != socket.gethostname():
+        return True
+    try:
+        os.kill(job_owner['pid'], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def fail(state: dict, message: str = FAILED_MESSAGE):
+    state['status'] = FAILED
+    state['error'] = message
+    state['finished'] = time.time()
+    write_state(state)
+
+
+def check_owner(state: dict) -> dict:
+    """
+    Fails a queued or running job whose owner died
+    """
+    if state['status'] in (QUEUED, RUNNING) and not owner_alive(state):
+        log.error("Export job %s lost its process %s",
+                  state['job_id'], state['owner']['pid'])
+        fail(state)
+    return state
+
+
+def is_fresh(state: dict) -> bool:
+    """
+    Whether a request can use the job instead of starting a new one
+    """
+    now = time.time()
+    if state['status'] == DONE:
+        return now - state['finished'] < settings.EXPORT_JOB_TTL and \
+            os.path.exists(export_path(state['job_id'], state['extension']))
+    if state['status'] in (QUEUED, RUNNING):
+        return now - state['updated'] < settings.EXPORT_JOB_STALE
+    return False
+
+
+def remove_expired():
+    """
+    Removes the jobs that finished more than EXPORT_JOB_TTL ago
+    """
+    now = time.time()
+    for name in os.listdir(settings.EXPORT_JOB_DIR):
+        path = os.path.join(settings.EXPORT_JOB_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > \
+                    settings.EXPORT_JOB_TTL + settings.EXPORT_JOB_STALE:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    The pool of export processes of the current web worker,
+    created on first use like the elastic client
+    """
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.EXPORT_JOB_WORKERS)
+                _executor_pid = pid
+    return _executor
+
+
+def _reset_executor():
+    global _executor
+
+    with _lock:
+        _executor = None
+
+
+def _job_done(job_id: str, future):
+    """
+    Fails a job whose export process died before it could finish,
+    run() itself records every other outcome
+    """
+    if future.cancelled() or future.exception() is None:
+        return
+    log.error("Export job %s lost its process", job_id,
+              exc_info=future.exception())
+    state = read_state(job_id)
+    if state and state['status'] in (QUEUED, RUNNING):
+        fail(state)
+
+
+def submit(view) -> Job:
+    """
+    Starts the export of the request of an export view in the
+    background, unless a fresh job for the same request exists
+    """
+    job_id = view.cache_key('export_job', (ASYNC_PARAMETER,)) or \
+        uuid.uuid4().hex
+    state = read_state(job_id)
+    if state and is_fresh(check_owner(state)):
+        return Job(state, False)
+
+    os.makedirs(settings.EXPORT_JOB_DIR, exist_ok=True)
+    remove_expired()
+    state = {
+        'job_id': job_id,
+        'view': view_path(view),
+        'status': QUEUED,
+        'owner': owner(),
+        'format': view.export_format,
+        'extension': view.export_formats[view.export_format][1],
+        'compressed': view.compressible(),
+        'rows': 0,
+        'total': None,
+        'started': time.time(),
+        'finished': None,
+        'error': None,
+    }
+    if state['compressed']:
+        state['extension'] += '.gz'
+    write_state(state)
+
+    parameters = [
+        (name, value) for name, values in view.canonical_parameters()
+        if name != ASYNC_PARAMETER for value in values]
+    if not settings.EXPORT_JOB_WORKERS:
+        run(state['view'], parameters, job_id)
+        return Job(read_state(job_id), False)
+    try:
+        future = get_executor().submit(
+            run, state['view'], parameters, job_id)
+    except BrokenProcessPool:
+        _reset_executor()
+        future = get_executor().submit(
+            run, state['view'], parameters, job_id)
+    future.add_done_callback(functools.partial(_job_done, job_id))
+    return Job(state, False)
+
+
+def find(view, job_id: str, download: bool) -> Job:
+    """
+    The job of an export view, raises Http404 when there is no
+    such job, or when it has no file to download yet
+    """
+    state = read_state(job_id)
+    if not state or state['view'] != view_path(view):
+        raise Http404("Unknown export job")
+    state = check_owner(state)
+    if download and state['status'] != DONE:
+        raise Http404("The export is not finished")
+    return Job(state, download)
+
+
+def _counted(hits, state: dict):
+    """
+    Passes the hits on, counting them in the state of the job
+    """
+    written = time.time()
+    for hit in hits:
+        yield hit
+        state['rows'] += 1
+        if time.time() - written >= PROGRESS_INTERVAL:
+            write_state(state)
+            written = time.time()
+
+
+def admit(view, state: dict) -> admission.Ticket:
+    """
+    Takes the export lane slots of a job, like a streamed export
+    of the same request. The job stays queued while the lane is
+    full, writing its state to keep it from going stale.
+    """
+    while True:
+        try:
+            return admission.admit('export', view.estimated_cost())
+        except admission.Saturated:
+            write_state(state)
+
+
+def run(view_class_path: str, parameters: list, job_id: str):
+    """
+    Writes the export of an export view for the given request
+    parameters to the file of the job. Runs in an export process,
+    holding export lane slots for the whole scan.
+    """
+    state = read_state(job_id)
+    state['owner'] = owner()
+    path = export_path(job_id, state['extension'])
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    ticket = admission.Ticket()
+    try:
+        request, view = prebuilt.setup_view(
+            import_string(view_class_path), parameters)
+        view.export_format = state['format']
+        ticket = admit(view, state)
+        state['status'] = RUNNING
+        state['total'] = view.count_rows()
+        write_state(state)
+
+        chunks = view.export_chunks(
+            request, _counted(view.load_from_elastic(), state))
+        if state['compressed']:
+            chunks = compression.compress_stream(chunks, 'gzip')
+        with open(temp_path, 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk.encode('utf-8')
+                          if isinstance(chunk, str) else chunk)
+        os.replace(temp_path, path)
+    except admission.TooCostly as exc:
+        log.warning("Export job %s is too costly: %s", job_id, exc)
+        fail(state, str(exc))
+    except Exception:
+        log.exception("Export job %s failed", job_id)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        fail(state)
+    else:
+        state['status'] = DONE
+        state['finished'] = time.time()
+        write_state(state)
+    finally:
+        ticket.close()
+
+
+def job_path(request, job_id: str) -> str:
+    """
+    The url of the status of a job, below the export url of the request
+    """
+    path = request.path
+    export = path[:path.index('/export/') + len('/export/')]
+    return request.build_absolute_uri(f'{export}jobs/{job_id}/')
+
+
+def status(request, state: dict) -> dict:
+    """
+    The state of a job as shown to the client, with an estimate
+    of the seconds until it is done
+    """
+    url = job_path(request, state['job_id'])
+    result = {
+        'job_id': state['job_id'],
+        'status': state['status'],
+        'format': state['format'],
+        'rows': state['rows'],
+        'total': state['total'],
+        'seconds_remaining': None,
+        'status_url': url,
+    }
+    if state['status'] == RUNNING and state['rows'] and state['total']:
+        elapsed = state['updated'] - state['started']
+        result['seconds_remaining'] = round(
+            elapsed / state['rows'] * max(0, state['total'] - state['rows']))
+    if state['status'] == DONE:
+        result['seconds_remaining'] = 0
+        result['download_url'] = f'{url}download/'
+    if state['status'] == FAILED:
+        result['error'] = state['error']
+    return result
+
+
+def status_response(request, state: dict) -> HttpResponse:
+    """
+    The status of a job, 202 Accepted while it runs
+    """
+    response = HttpResponse(
+        json.dumps(status(request, state)),
+        content_type='application/json',
+        status=202 if state['status'] in (QUEUED, RUNNING) else 200)
+    response['Location'] = job_path(request, state['job_id'])
+    return response
+
+
+def download_response(request, state: dict, content_type: str):
+    """
+    The file of a finished job. A compressed file is sent gzip
+    encoded when the client accepts it, as a gzip file otherwise.
+    """
+    export_file = open(export_path(state['job_id'], state['extension']), 'rb')
+    export = prebuilt.PrebuiltExport(
+        export_file, f"job/{state['job_id']}/{state['finished']}")
+    if not state['compressed']:
+        return prebuilt.file_response(request, export, content_type, None)
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        return prebuilt.file_response(request, export, content_type, 'gzip')
+    return prebuilt.file_response(request, export, 'application/gzip', None)
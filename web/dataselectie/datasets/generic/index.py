@@ -1,4 +1,5 @@
 # Python
+import json
 import logging
 import time
 # Packages
@@ -10,9 +11,14 @@ from django.db.models import BigIntegerField
 import elasticsearch
 from elasticsearch import helpers
 from elasticsearch.exceptions import NotFoundError
+from elasticsearch.serializer import JSONSerializer
 import elasticsearch_dsl as es
 from elasticsearch_dsl.connections import connections
 
+from datasets.generic import index_meta
+from datasets.generic import prebuilt
+from datasets.generic.elastic import get_client
+
 log = logging.getLogger(__name__)
 
 
@@ -74,6 +80,9 @@ class CreateDocTypeTask(object):
         idx.create()
         idx.refresh()
 
+        index_meta.update(
+            self.index, generation=index_meta.new_generation())
+
 
 def return_qs_parts(qs, modulo, modulo_value, sequential=False):
     """
@@ -140,9 +149,24 @@ def return_qs_parts(qs, modulo, modulo_value, sequential=False):
         yield qs_ss, i/qs_count
 
 
+def add_export_rows(view_class, docs: list):
+    """
+    Stores the line every document has in the CSV export of
+    the view in its export_row field. The documents are rendered
+    from their JSON, exactly as the export reads them.
+    """
+    serializer = JSONSerializer()
+    items = [json.loads(serializer.dumps(doc.to_dict())) for doc in docs]
+    for doc, line in zip(docs, view_class().render_rows(items)):
+        doc.export_row = line
+
+
 class ImportIndexTask(object):
     queryset = None
     sequential = False
+    # The CSV export view of the index. When given, and enabled with
+    # settings.INDEX_EXPORT_ROWS, every document stores its CSV line.
+    export_view = None
 
     client = elasticsearch.Elasticsearch(
         hosts=settings.ELASTIC_SEARCH_HOSTS,
@@ -160,6 +184,15 @@ class ImportIndexTask(object):
     def convert(self, obj):
         raise NotImplementedError()
 
+    def export_rows(self) -> bool:
+        return self.export_view is not None and settings.INDEX_EXPORT_ROWS
+
+    def convert_batch(self, qs) -> list:
+        docs = [self.convert(obj) for obj in qs]
+        if self.export_rows():
+            add_export_rows(self.export_view, docs)
+        return docs
+
     def batch_qs(self):
         """
         Returns a (start, end, total, queryset) tuple
@@ -208,7 +241,8 @@ class ImportIndexTask(object):
 
             helpers.bulk(
                 self.client,
-                (self.convert(obj).to_dict(include_meta=True) for obj in qs),
+                (doc.to_dict(include_meta=True)
+                 for doc in self.convert_batch(qs)),
                 raise_on_error=True,
             )
 
@@ -216,3 +250,115 @@ class ImportIndexTask(object):
             idx = es.Index(self.index)
             # refresh index, make sure its ready for queries
             idx.refresh()
+
+        if self.index:
+            index_meta.update(
+                self.index, generation=index_meta.new_generation(),
+                export_rows=self.export_rows())
+
+
+class FacetStatsTask(object):
+    """
+    Counts the distinct values of every facet field in the
+    finished index and stores them in the index metadata.
+    The facet planner in generic/queries.py uses these counts
+    to size its aggregations.
+
+    The counts change the search bodies, so they are stored
+    together with a new generation of the index. Results cached
+    with the plans of the previous counts are not used again.
+    """
+    index = ''  # type: str
+    facets = {}
+    name = 'Collect facet statistics'
+
+    # Highest precision threshold elastic supports, counts below
+    # it are close to exact
+    precision_threshold = 40000
+
+    def __init__(self):
+
+        if not self.index:
+            raise ValueError("No index specified")
+
+    def execute(self):
+        client = get_client()
+        client.indices.refresh(index=self.index)
+
+        fields = sorted(set(self.facets.values()))
+        result = client.search(index=self.index, body={
+            'size': 0,
+            'aggs': {
+                field: {
+                    'cardinality': {
+                        'field': field,
+                        'precision_threshold': self.precision_threshold,
+                    }
+                } for field in fields
+            }
+        })
+        cardinality = {
+            field: result['aggregations'][field]['value'] for field in fields}
+
+        index_meta.update(
+            self.index, facet_cardinality=cardinality,
+            generation=index_meta.new_generation())
+        log.info("Facet cardinality of %s: %s", self.index, cardinality)
+
+
+class ExportStatsTask(object):
+    """
+    Measures the average width of a line in the CSV export of
+    an export view on a random sample of the finished index, and
+    stores it in the index metadata. The export preflight uses it
+    to estimate the size of an export, see generic/preflight.py
+    """
+    view = None
+    name = 'Collect export statistics'
+    sample_size = 1000
+
+    def __init__(self):
+
+        if self.view is None:
+            raise ValueError("No view specified")
+
+    def execute(self):
+        index = settings.ELASTIC_INDICES[self.view.index]
+        client = get_client()
+        client.indices.refresh(index=index)
+
+        hits = client.search(index=index, body={
+            'size': self.sample_size,
+            'query': {'function_score': {'random_score': {}}},
+        })['hits']['hits']
+        sources = [hit['_source'] for hit in hits]
+        lines = [source.pop('export_row', None) for source in sources]
+        if not all(lines):
+            # The index was built without the lines
+            lines = self.view().render_rows(sources)
+        if not lines:
+            return
+
+        row_bytes = sum(
+            len(line.encode('utf-8')) for line in lines) / len(lines)
+        index_meta.update(index, export_row_bytes=row_bytes)
+        log.info("Export line width of %s: %.1f bytes", index, row_bytes)
+
+
+class PrebuiltExportTask(object):
+    """
+    Writes the prebuilt exports of an export view for the
+    finished index, see generic/prebuilt.py
+    """
+    view = None
+    name = 'Write prebuilt exports'
+
+    def __init__(self):
+
+        if self.view is None:
+            raise ValueError("No view specified")
+
+    def execute(self):
+        get_client().indices.refresh(
+            index=settings.ELASTIC_INDICES[self.view.index])
+        prebuilt.write_exports(self.view)
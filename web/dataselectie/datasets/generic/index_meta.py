@@ -0,0 +1,105 @@
+"""
+==================================================
+ Index metadata
+--------------------------------------------------
+ Statistics collected while building an index are
+ stored in the _meta of its mapping, so they are
+ part of the snapshot that is restored in
+ production. Views read them through a short lived
+ in-process cache.
+==================================================
+"""
+# Python
+import logging
+from datetime import datetime
+
+# Packages
+from django.conf import settings
+from django.core.cache import caches
+from elasticsearch.exceptions import TransportError
+
+from datasets.generic import cache
+from datasets.generic.elastic import get_client, request_timeout
+
+log = logging.getLogger(__name__)
+
+META_KEY = 'index_meta:{}'
+
+
+def read(index: str) -> dict:
+    """
+    The _meta of the given elastic index, an empty dict when
+    the index or its metadata does not exist
+    """
+    key = META_KEY.format(index)
+    meta = caches[cache.LOCAL].get(key)
+    if meta is None:
+        try:
+            mappings = get_client().indices.get_mapping(
+                index=index, request_timeout=request_timeout('health'))
+        except TransportError:
+            # Not cached, the next request tries again
+            log.exception("Could not read the metadata of index %s", index)
+            return {}
+        meta = {}
+        for index_mapping in mappings.values():
+            for mapping in index_mapping['mappings'].values():
+                meta.update(mapping.get('_meta', {}))
+        caches[cache.LOCAL].set(key, meta, settings.INDEX_META_TTL)
+    return meta
+
+
+def update(index: str, **values):
+    """
+    Adds values to the _meta of every doc type in the given
+    elastic index, keeping the values already there
+    """
+    client = get_client()
+    mappings = client.indices.get_mapping(index=index)
+    for index_mapping in mappings.values():
+        for doc_type, mapping in index_mapping['mappings'].items():
+            meta = mapping.get('_meta', {})
+            meta.update(values)
+            client.indices.put_mapping(
+                index=index, doc_type=doc_type, body={'_meta': meta})
+    caches[cache.LOCAL].delete(META_KEY.format(index))
+
+
+def facet_cardinality(index: str) -> dict:
+    """
+    The number of distinct values per facet field as counted
+    after the last build, field: count
+    """
+    return read(index).get('facet_cardinality', {})
+
+
+def export_rows(index: str) -> bool:
+    """
+    Whether the documents of the last build store their CSV line
+    """
+    return read(index).get('export_rows', False)
+
+
+def export_row_bytes(index: str):
+    """
+    The average number of bytes of a CSV line of the last build,
+    None when it was not measured
+    """
+    return read(index).get('export_row_bytes')
+
+
+def new_generation() -> str:
+    """
+    A generation marker for an index that has just been (re)built
+    """
+    return datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+
+
+def generation(index: str):
+    """
+    The generation of the given elastic index, which changes every
+    time the index is created or documents are imported. None when
+    it is unknown, because the metadata could not be read or the
+    index was built without it.
+    """
+    return read(index).get('generation')
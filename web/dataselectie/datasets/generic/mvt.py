@@ -0,0 +1,133 @@
+"""
+==================================================
+ Mapbox vector tiles
+--------------------------------------------------
+ A minimal encoder for tiles with a single layer
+ of points, following version 2.1 of the vector
+ tile specification. Only the parts of protobuf
+ the tile messages use are implemented.
+==================================================
+"""
+# Python
+import math
+import struct
+
+EXTENT = 4096
+
+CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+# Protobuf wire types
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+
+POINT = 1
+MOVE_TO = 1
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple:
+    """
+    The west, south, east, north in WGS84 of a web mercator tile
+    """
+    n = 2 ** z
+
+    def lat(tile_y):
+        return math.degrees(
+            math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
+
+def tile_position(z: int, x: int, y: int, lon: float, lat: float,
+                  extent=EXTENT) -> tuple:
+    """
+    The position of a WGS84 point in the coordinates of a tile
+    """
+    n = 2 ** z
+    lat_rad = math.radians(lat)
+    tile_x = (lon + 180) / 360 * n
+    tile_y = (1 - math.asinh(math.tan(lat_rad)) / math.pi) / 2 * n
+    return (int(round((tile_x - x) * extent)),
+            int(round((tile_y - y) * extent)))
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint(field << 3 | wire_type)
+
+
+def _varint_field(field: int, value: int) -> bytes:
+    return _key(field, VARINT) + _varint(value)
+
+
+def _bytes_field(field: int, data: bytes) -> bytes:
+    return _key(field, LENGTH_DELIMITED) + _varint(len(data)) + data
+
+
+def _packed_field(field: int, values) -> bytes:
+    return _bytes_field(field, b''.join(_varint(value) for value in values))
+
+
+def _value(value) -> bytes:
+    """
+    A Value message
+    """
+    if isinstance(value, bool):
+        return _varint_field(7, int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _varint_field(5, value)
+        return _varint_field(6, _zigzag(value))
+    if isinstance(value, float):
+        return _key(3, FIXED64) + struct.pack('<d', value)
+    return _bytes_field(1, str(value).encode('utf-8'))
+
+
+def encode(layer: str, points, extent=EXTENT) -> bytes:
+    """
+    Encodes a tile with one layer of points
+
+    layer - the name of the layer
+    points - (x, y, properties) in tile coordinates, see
+        tile_position, properties is a dict of name: value
+
+    A tile without points is empty
+    """
+    keys, values = {}, {}
+    features = []
+    for x, y, properties in points:
+        tags = []
+        for name, value in properties.items():
+            tags.append(keys.setdefault(name, len(keys)))
+            tags.append(values.setdefault(
+                (type(value), value), len(values)))
+        features.append(_bytes_field(2, b''.join([
+            _packed_field(2, tags),
+            _varint_field(3, POINT),
+            _packed_field(4, [
+                MOVE_TO | 1 << 3, _zigzag(x), _zigzag(y)]),
+        ])))
+    if not features:
+        return b''
+
+    message = [_varint_field(15, 2), _bytes_field(1, layer.encode('utf-8'))]
+    message.extend(features)
+    message.extend(_bytes_field(3, key.encode('utf-8')) for key in keys)
+    message.extend(_bytes_field(4, _value(value)) for _type, value in values)
+    message.append(_varint_field(5, extent))
+    return _bytes_field(3, b''.join(message))
@@ -0,0 +1,198 @@
+"""
+==================================================
+ Prebuilt exports
+--------------------------------------------------
+ The most requested exports, the unfiltered index
+ and a single stadsdeel, are written to gzipped
+ CSV files when the index is built. The export
+ views serve these files instead of scrolling
+ through elastic, see CSVExportView.
+
+ Files are stored per index generation, a rebuilt
+ index never serves the files of the previous one.
+==================================================
+"""
+# Python
+import gzip
+import logging
+import os
+import re
+import shutil
+from collections import namedtuple
+from urllib.parse import quote, urlencode
+
+# Packages
+from django.conf import settings
+from django.http import FileResponse, HttpRequest, HttpResponse, QueryDict
+from django.http import StreamingHttpResponse
+from django.utils.http import quote_etag
+
+from datasets.generic import index_meta
+from datasets.generic.elastic import get_client, request_timeout
+
+log = logging.getLogger(__name__)
+
+# The name of the export of the whole index
+ALL = 'all'
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+# An opened prebuilt export file
+PrebuiltExport = namedtuple('PrebuiltExport', ['file', 'etag'])
+
+
+def selection_name(parameter: str, value: str) -> str:
+    """
+    The name of the export of the documents with the given
+    value for a filter parameter
+    """
+    return '{}-{}'.format(parameter, quote(value, safe=''))
+
+
+def export_path(index: str, generation: str, name: str) -> str:
+    return os.path.join(
+        settings.PREBUILT_EXPORT_DIR, index, generation, f'{name}.csv.gz')
+
+
+def open_export(index: str, name: str):
+    """
+    The prebuilt export of the current generation of the index,
+    None when it was not written
+    """
+    generation = index_meta.generation(index)
+    if not generation:
+        return None
+    try:
+        export_file = open(export_path(index, generation, name), 'rb')
+    except FileNotFoundError:
+        return None
+    return PrebuiltExport(export_file, f'{index}/{generation}/{name}')
+
+
+def setup_view(view_class, parameters) -> tuple:
+    """
+    The request and the view for a GET request with the given
+    parameters, a dict or a list of (name, value) pairs, outside
+    of a web request
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(urlencode(parameters))
+    view = view_class()
+    view.setup(request)
+    view.request_parameters = request.GET
+    return request, view
+
+
+def write_export(view_class, parameters: dict, path: str):
+    """
+    Writes the export of a view for the given request parameters
+    """
+    request, view = setup_view(view_class, parameters)
+    rows = view.result_generator(request, view.load_from_elastic())
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as raw, gzip.GzipFile(
+            filename='', mode='wb', fileobj=raw,
+            compresslevel=settings.PREBUILT_EXPORT_COMPRESSLEVEL) as out:
+        for chunk in rows:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out.write(chunk)
+    os.replace(temp_path, path)
+
+
+def write_exports(view_class):
+    """
+    Writes the export of the whole index and of every value of the
+    prebuilt_parameter of an export view, and removes the exports
+    of earlier generations
+    """
+    index = settings.ELASTIC_INDICES[view_class.index]
+    generation = index_meta.generation(index)
+    if not generation:
+        log.warning("Index %s has no generation, no exports written", index)
+        return
+
+    parameter = view_class.prebuilt_parameter
+    field = view_class().get_filter_field(parameter)
+    result = get_client().search(index=index, body={
+        'size': 0,
+        'aggs': {field: {'terms': {'field': field, 'size': 1000}}},
+    }, request_timeout=request_timeout('export'))
+    values = [
+        bucket['key']
+        for bucket in result['aggregations'][field]['buckets']]
+
+    directory = os.path.dirname(export_path(index, generation, ALL))
+    os.makedirs(directory, exist_ok=True)
+    write_export(view_class, {}, export_path(index, generation, ALL))
+    for value in values:
+        write_export(
+            view_class, {parameter: value},
+            export_path(index, generation, selection_name(parameter, value)))
+    log.info("Wrote %s exports of %s generation %s",
+             len(values) + 1, index, generation)
+
+    index_directory = os.path.dirname(directory)
+    for name in os.listdir(index_directory):
+        if name != generation:
+            shutil.rmtree(
+                os.path.join(index_directory, name), ignore_errors=True)
+
+
+def _read(export_file, length: int):
+    while length > 0:
+        data = export_file.read(min(CHUNK_SIZE, length))
+        if not data:
+            break
+        length -= len(data)
+        yield data
+    export_file.close()
+
+
+def file_response(request, export: PrebuiltExport,
+                  content_type='text/csv', encoding='gzip'):
+    """
+    Serves an export file, by default a prebuilt export as gzip
+    encoded CSV. A whole file is
+    passed to the server as a file, which uwsgi sends with sendfile.
+    A single byte range is answered with 206 Partial Content, as long
+    as If-Range, when given, matches the ETag.
+    """
+    size = os.fstat(export.file.fileno()).st_size
+    etag = quote_etag(export.etag)
+
+    byte_range = RANGE.match(request.META.get('HTTP_RANGE', ''))
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range and (not if_range or if_range == etag):
+        first, last = byte_range.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start, end = 0, -1
+        if start > end:
+            export.file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        export.file.seek(start)
+        response = StreamingHttpResponse(
+            _read(export.file, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(export.file)
+        response['Content-Length'] = size
+
+    response['Content-Type'] = content_type
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    response['Vary'] = 'Accept-Encoding'
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,111 @@
+"""
+==================================================
+ Export preflight
+--------------------------------------------------
+ Estimates the size of an export before it is
+ downloaded: the number of rows from a count
+ search, the bytes from the average width of a
+ CSV line measured when the index was built, see
+ ExportStatsTask, and the duration from the
+ throughput of earlier exports of the index.
+
+ Every streamed export logs its number of rows,
+ bytes and seconds when it is complete, which
+ also updates the throughput.
+==================================================
+"""
+# Python
+import logging
+import time
+
+# Packages
+from django.conf import settings
+from django.core.cache import caches
+
+from datasets.generic import cache
+from datasets.generic import index_meta
+
+log = logging.getLogger(__name__)
+
+THROUGHPUT_KEY = 'export_throughput:{}'
+# The weight of the latest export in the throughput
+SMOOTHING = 0.2
+# Smaller exports say little about the throughput
+MIN_ROWS = 1000
+
+
+def throughput(index: str) -> float:
+    """
+    The rows per second of the exports of the given index
+    """
+    return caches[cache.SHARED].get(THROUGHPUT_KEY.format(index)) or \
+        settings.EXPORT_ROWS_PER_SECOND
+
+
+def record(index: str, rows: int, seconds: float):
+    """
+    Adds the throughput of a complete export to the throughput
+    of the index
+    """
+    if rows < MIN_ROWS or seconds <= 0:
+        return
+    key = THROUGHPUT_KEY.format(index)
+    observed = rows / seconds
+    previous = caches[cache.SHARED].get(key)
+    if previous:
+        observed = previous + SMOOTHING * (observed - previous)
+    caches[cache.SHARED].set(key, observed, None)
+
+
+def estimate(index: str, rows: int, header_bytes: int,
+             export_format: str) -> dict:
+    """
+    The estimated rows, uncompressed bytes and seconds of an export.
+    The width of a row is only known for CSV, bytes is None for the
+    other formats and for indices built without measuring it.
+    """
+    row_bytes = index_meta.export_row_bytes(index)
+    size = None
+    if row_bytes and export_format == 'csv':
+        size = round(header_bytes + rows * row_bytes)
+    return {
+        'format': export_format,
+        'rows': rows,
+        'bytes': size,
+        'seconds': round(rows / throughput(index), 1),
+    }
+
+
+class ExportSummary(object):
+    """
+    Counts the rows and bytes of a streamed export, and logs
+    and records them when the export is complete
+    """
+    def __init__(self, index: str, name: str):
+        self.index = index
+        self.name = name
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+
+    def count_rows(self, hits):
+        for hit in hits:
+            self.rows += 1
+            yield hit
+
+    def count_bytes(self, chunks):
+        """
+        Passes the uncompressed chunks of the export on, and
+        summarizes the export after the last one
+        """
+        for chunk in chunks:
+            self.bytes += len(
+                chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            yield chunk
+        self.complete()
+
+    def complete(self):
+        seconds = time.monotonic() - self.started
+        log.info("Export %s of %s: %d rows, %d bytes in %.1f seconds",
+                 self.name, self.index, self.rows, self.bytes, seconds)
+        record(self.index, self.rows, seconds)
@@ -0,0 +1,79 @@
+"""
+==================================================
+ Batched coordinate projection
+--------------------------------------------------
+ Projects the coordinates of a whole batch of
+ export rows in a single GDAL call. The points are
+ passed to and read from GDAL as one MultiPoint in
+ WKB, so no Python object is made per point.
+
+ Coordinate transformations are created once per
+ thread, GDAL transformations can not be shared
+ between threads.
+==================================================
+"""
+# Python
+import struct
+import threading
+
+# Packages
+from django.contrib.gis.gdal import CoordTransform, OGRGeometry
+from django.contrib.gis.gdal import SpatialReference
+
+SRID_WGS84 = 4326
+SRID_RD = 28992
+
+# WKB geometry types
+WKB_POINT = 1
+WKB_MULTIPOINT = 4
+# Byte order, type and number of points of a MultiPoint
+MULTIPOINT_HEADER = struct.Struct('<BII')
+# Byte order, type and x, y of every point
+POINT = struct.Struct('<BIdd')
+
+_local = threading.local()
+
+
+def coord_transform(source: int, target: int) -> CoordTransform:
+    """
+    The transformation between two spatial references, created
+    on first use in the current thread
+    """
+    transforms = getattr(_local, 'transforms', None)
+    if transforms is None:
+        transforms = _local.transforms = {}
+    key = (source, target)
+    if key not in transforms:
+        transforms[key] = CoordTransform(
+            SpatialReference(source), SpatialReference(target))
+    return transforms[key]
+
+
+def project(xs: list, ys: list, source: int, target: int) -> tuple:
+    """
+    Projects the points xs, ys from the source to the
+    target spatial reference, returns the lists xs, ys
+    of the projected points
+    """
+    count = len(xs)
+    if not count:
+        return [], []
+    wkb = MULTIPOINT_HEADER.pack(1, WKB_MULTIPOINT, count) + b''.join(
+        POINT.pack(1, WKB_POINT, x, y) for x, y in zip(xs, ys))
+
+    geometry = OGRGeometry(memoryview(wkb))
+    geometry.transform(coord_transform(source, target))
+
+    # GDAL writes WKB in the byte order of the machine
+    projected = bytes(geometry.wkb)
+    byte_order = '<' if projected[0] == 1 else '>'
+    values = struct.unpack(
+        byte_order + 'BIdd' * count, projected[MULTIPOINT_HEADER.size:])
+    return list(values[2::4]), list(values[3::4])
+
+
+def wgs84_to_rd(lons: list, lats: list) -> tuple:
+    """
+    The RD x, y of WGS84 points
+    """
+    return project(lons, lats, SRID_WGS84, SRID_RD)
@@ -11,7 +11,13 @@
 # Packages
 # from elasticsearch_dsl import Search, Q, A
 
+import json
 import logging
+from collections import namedtuple
+
+from django.conf import settings
+
+from datasets.generic import index_meta
 
 log = logging.getLogger(__name__)
 
@@ -41,3 +47,143 @@ def create_query(query, aggs=None, sort=None, default_query=None, qtype=None):
     if sort:
         q.update(sort)
     return q
+
+
+def canonical_body(body: dict) -> str:
+    """
+    Serializes a search body to stable JSON. Keys are sorted and the
+    filters of a bool query are deduplicated and sorted, so
+    semantically identical searches give byte identical bodies. The
+    elastic shard request cache is keyed on these bytes.
+    """
+    bool_query = body.get('query', {}).get('bool')
+    if bool_query and bool_query.get('filter'):
+        filters = bool_query['filter']
+        if isinstance(filters, dict):
+            filters = [filters]
+        filters = sorted({
+            json.dumps(item, sort_keys=True, separators=(',', ':')): item
+            for item in filters}.items())
+        body = dict(body, query=dict(
+            body['query'],
+            bool=dict(bool_query, filter=[item for _key, item in filters])))
+    return json.dumps(body, sort_keys=True, separators=(',', ':'))
+
+
+class QueryPlanError(Exception):
+    pass
+
+
+# The body keys an endpoint role does not use, and the values it fixes
+QueryPlan = namedtuple('QueryPlan', ['drop', 'fixed'])
+
+PAGING = ('from', 'search_after')
+
+QUERY_PLANS = {
+    # A page of documents in the sort order
+    'table': QueryPlan(('aggs',), {}),
+    # The facet buckets, no documents
+    'facets': QueryPlan(('sort', '_source') + PAGING, {'size': 0}),
+    # Every location, in any order
+    'geolocation': QueryPlan(('aggs', 'sort') + PAGING, {}),
+    # The locations grouped in cells, no documents
+    'clusters': QueryPlan(('sort', '_source') + PAGING, {'size': 0}),
+    # Every document, scrolled in index order
+    'export': QueryPlan(('aggs', 'sort') + PAGING, {}),
+    # Every document, scrolled in the sort order
+    'sorted_export': QueryPlan(('aggs',) + PAGING, {}),
+    # Every document in pages in the sort order, see resumable.py
+    'resumable_export': QueryPlan(('aggs', 'from'), {}),
+    # Only the number of documents
+    'count': QueryPlan(('aggs', 'sort', '_source') + PAGING, {'size': 0}),
+}
+
+
+def plan_query(body: dict, role: str) -> dict:
+    """
+    The part of a search body the given endpoint role needs,
+    see QUERY_PLANS. The body itself is not changed.
+    """
+    plan = QUERY_PLANS[role]
+    query = {
+        key: value for key, value in body.items() if key not in plan.drop}
+    query.update(plan.fixed)
+    return query
+
+
+def verify_plan(body: dict, role: str):
+    """
+    Raises QueryPlanError when a search body holds more than its
+    endpoint role needs, e.g. aggregations in a geolocation search
+    """
+    plan = QUERY_PLANS[role]
+    unused = sorted(key for key in plan.drop if key in body)
+    if unused:
+        raise QueryPlanError(
+            f"{role} search with unused {', '.join(unused)}")
+    for key, value in plan.fixed.items():
+        if body.get(key) != value:
+            raise QueryPlanError(
+                f"{role} search with {key} {body.get(key)}, expected {value}")
+
+
+def plan_terms_size(cardinality):
+    """
+    The terms aggregation size for a field with the given number
+    of distinct values, and whether that size returns all buckets.
+    Fields with an unknown cardinality get the default size.
+    """
+    if cardinality is None:
+        return settings.AGGS_VALUE_SIZE, False
+    size = cardinality + int(cardinality * settings.AGGS_SIZE_MARGIN) + 1
+    if size > settings.AGGS_VALUE_SIZE:
+        return settings.AGGS_VALUE_SIZE, False
+    return size, True
+
+
+def create_aggs(facets: dict, names=None, index=None) -> dict:
+    """
+    Creates a terms aggregation for each facet.
+
+    facets - dict of facet name: elastic field
+    names - the facets to aggregate on, all facets when None
+    index - the elastic index, used to look up the cardinality
+        of the facet fields recorded when the index was built
+
+    A terms aggregation that is known to return all buckets is
+    sized to fit, its bucket count is exact. Only facets that may
+    be truncated get a cardinality aggregation counting their
+    distinct values.
+
+    Returns None when there is nothing to aggregate
+    """
+    if names is None:
+        names = facets.keys()
+    if not names:
+        return None
+
+    cardinality = index_meta.facet_cardinality(index) if index else {}
+
+    aggs = {'aggs': {}}
+    count_aggs = {}
+    for name in names:
+        field = facets[name]
+        size, complete = plan_terms_size(cardinality.get(field))
+        terms = {
+            'field': field,
+            'size': size,
+            'order': {'_term': 'asc'},
+        }
+        if complete:
+            # Every shard holds at most size terms
+            terms['shard_size'] = size
+        else:
+            count_aggs[f'{name}_count'] = {
+                'cardinality': {
+                    'field': field,
+                    'precision_threshold': 1000
+                }
+            }
+        aggs['aggs'][name] = {'terms': terms}
+    aggs['aggs'].update(count_aggs)
+    return aggs
@@ -0,0 +1,112 @@
+"""
+==================================================
+ Resumable exports
+--------------------------------------------------
+ An export requested with resumable=true is read
+ in the order of the unique sort_tiebreaker field
+ with search_after, a page of DOWNLOAD_BATCH rows
+ at a time. The sort values of the last row of
+ every page are kept as the checkpoint of its row
+ offset, in a cache of their own (cache.RESUME)
+ so they do not push out the search results.
+
+ A download that broke off continues with a
+ request for the same url with
+
+   Range: rows=<number of rows received>-
+   If-Range: <ETag of the export>
+
+ which is answered with 206 Partial Content and
+ the rows from that offset on, searched after the
+ checkpoint before it.
+
+ Elastic 6 has no point in time searches, instead
+ the ETag and the checkpoints are bound to the
+ generation of the index, see index_meta.py. When
+ the index was rebuilt in between, the whole
+ export is sent again with 200.
+==================================================
+"""
+# Python
+import re
+from collections import namedtuple
+
+# Packages
+from django.conf import settings
+from django.core.cache import caches
+
+from datasets.generic import cache
+
+# The request parameter that asks for a resumable export
+PARAMETER = 'resumable'
+
+RANGE_UNIT = 'rows'
+RANGE = re.compile(r'^rows=(\d+)-$')
+
+# Where an export starts: its id, the first row, and the sort
+# values to search after, None for the first page
+Resume = namedtuple('Resume', ['export_id', 'offset', 'search_after'])
+
+
+def checkpoint_key(export_id: str, offset: int) -> str:
+    return cache.make_key('resume', export_id, offset)
+
+
+def save_checkpoint(export_id: str, offset: int, sort_values: list):
+    caches[cache.RESUME].set(checkpoint_key(export_id, offset), sort_values)
+
+
+def load_checkpoint(export_id: str, offset: int):
+    """
+    The sort values of the row before the offset, None when
+    the checkpoint expired or was never written
+    """
+    return caches[cache.RESUME].get(checkpoint_key(export_id, offset))
+
+
+def start(request, export_id: str, etag: str) -> Resume:
+    """
+    Where the export of the request starts. A Range of rows starts
+    at the page with the requested row, as long as If-Range, when
+    given, matches the ETag and the checkpoint of the page exists.
+    Otherwise the export starts at the first row, the Range is
+    ignored like HTTP allows.
+    """
+    first = Resume(export_id, 0, None)
+    row_range = RANGE.match(request.META.get('HTTP_RANGE', ''))
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not row_range or (if_range and if_range != etag):
+        return first
+    offset = int(row_range.group(1))
+    page_offset = offset - offset % settings.DOWNLOAD_BATCH
+    if not page_offset:
+        return Resume(export_id, offset, None)
+    search_after = load_checkpoint(export_id, page_offset)
+    if search_after is None:
+        return first
+    return Resume(export_id, offset, search_after)
+
+
+def scan_pages(client, query: dict, index: str, resume: Resume, **kwargs):
+    """
+    Yields the hits of a sorted query from the row offset of
+    resume on, writing a checkpoint after every page
+    """
+    page_size = settings.DOWNLOAD_BATCH
+    offset = resume.offset - resume.offset % page_size
+    skip = resume.offset - offset
+    search_after = resume.search_after
+    while True:
+        body = dict(query, size=page_size)
+        if search_after is not None:
+            body['search_after'] = search_after
+        hits = client.search(index=index, body=body, **kwargs)['hits']['hits']
+        if not hits:
+            return
+        offset += len(hits)
+        search_after = hits[-1]['sort']
+        save_checkpoint(resume.export_id, offset, search_after)
+        yield from hits[skip:]
+        skip = 0
+        if len(hits) < page_size:
+            return
@@ -1,22 +1,47 @@
 # Python
-import ast
+import base64
+import binascii
 import codecs
 import csv
+import functools
+import hashlib
 import io
 import json
 import logging
+import re
+import struct
 from datetime import date, datetime
+from itertools import islice
 
 from typing import Generator
 
 from django.conf import settings
-from django.contrib.gis.geos import GEOSGeometry
+from django.core.cache import caches
 from django.http import HttpResponse, StreamingHttpResponse, HttpResponseBadRequest
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import parse_etags, quote_etag
 from django.views.generic import View
-from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import TransportError
 from elasticsearch.helpers import scan
 from pytz import timezone
 
+from datasets.generic import admission
+from datasets.generic import cache
+from datasets.generic import columnar
+from datasets.generic import compression
+from datasets.generic import export_jobs
+from datasets.generic import index_meta
+from datasets.generic import mvt
+from datasets.generic import prebuilt
+from datasets.generic import preflight
+from datasets.generic import projection
+from datasets.generic import resumable
+from datasets.generic.elastic import get_client, raw_transport
+from datasets.generic.elastic import request_timeout, sliced_scan
+from datasets.generic.queries import canonical_body, plan_query, verify_plan
+
 log = logging.getLogger(__name__)
 
 
@@ -64,36 +89,196 @@ def stringify_item_value(value) -> str:
         return ''
 
 
-def create_geometry_dict(item):
+def create_geometry_dicts(items: list, formatted=True):
     """
-    Creates a geometry dict that can be used to add
-    geometry information to the result set
+    Adds geometry information to a batch of items of the
+    result set, projecting all centroids in a single call
 
-    Returns a dict with geometry information if one
-    can be created. If not, an empty dict is returned
+    Items without a centroid are left alone. Unless formatted
+    the WGS84 coordinates are floats.
+    """
+    located = [item for item in items if item.get('centroid')]
+    if not located:
+        return
+    lons = [item['centroid'][0] for item in located]
+    lats = [item['centroid'][1] for item in located]
+    rd_xs, rd_ys = projection.wgs84_to_rd(lons, lats)
+
+    for item, lon, lat, rd_x, rd_y in zip(located, lons, lats, rd_xs, rd_ys):
+        item['geometrie_rd_x'] = int(rd_x)
+        item['geometrie_rd_y'] = int(rd_y)
+        if formatted:
+            item['geometrie_wgs_lat'] = '{:.7f}'.format(lat).replace('.', ',')
+            item['geometrie_wgs_lon'] = '{:.7f}'.format(lon).replace('.', ',')
+        else:
+            item['geometrie_wgs_lat'] = float(lat)
+            item['geometrie_wgs_lon'] = float(lon)
+
+
+# One item of a list parameter in python notation, e.g. ['01', '02']
+LIST_ITEM = re.compile(r"""\s*(?:'([^']*)'|"([^"]*)"|([^,'"\s]+))\s*(?:,|$)""")
+
+
+def _parse_list_value(value: str):
+    """
+    Parses a list parameter written as a JSON list or as a flat
+    python list of strings and numbers. Returns None when the
+    value is not a list.
     """
-    res = {}
     try:
-        geom_wgs = GEOSGeometry(
-            f"POINT ({item['centroid'][0]} {item['centroid'][1]}) ", srid=4326)
-    except(AttributeError, KeyError):
-        geom_wgs = None
-
-    if geom_wgs:
-        # Convert to wgs
-        geom = geom_wgs.transform(28992, clone=True).coords
-        geom_wgs = geom_wgs.coords
-        res = {
-            'geometrie_rd_x': int(geom[0]),
-            'geometrie_rd_y': int(geom[1]),
-            'geometrie_wgs_lat': (
-                '{:.7f}'.format(geom_wgs[1])).replace('.', ','),
-
-            'geometrie_wgs_lon': (
-                '{:.7f}'.format(geom_wgs[0])).replace('.', ',')
+        items = json.loads(value)
+    except ValueError:
+        items = []
+        inner = value[1:-1].strip()
+        position = 0
+        while position < len(inner):
+            match = LIST_ITEM.match(inner, position)
+            if not match or match.end() == position:
+                return None
+            items.append(next(
+                group for group in match.groups() if group is not None))
+            position = match.end()
+    if not isinstance(items, list):
+        return None
+    return items
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_filter_values(values: tuple) -> tuple:
+    """
+    Parses the values of a filter parameter into a sorted tuple of
+    unique strings. A parameter can be repeated and every value
+    can be a single value or a list, e.g. ?sbi_code=41&sbi_code=351,
+    ?sbi_code=[41,351] or ?sbi_code=['41', '351']
+    """
+    result = set()
+    for value in values:
+        value = value.strip()
+        items = None
+        if value.startswith('[') and value.endswith(']'):
+            items = _parse_list_value(value)
+        elif len(value) > 1 and value[0] == value[-1] and value[0] in '\'"':
+            # A single quoted value
+            items = [value[1:-1]]
+        if items is None:
+            items = [value]
+        result.update(str(item) for item in items)
+    return tuple(sorted(result))
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_filters(signature: tuple) -> tuple:
+    """
+    Compiles filter parameters into elastic filters, one terms filter
+    per field. The signature is a tuple of (field, values) pairs, with
+    the values as returned by parse_filter_values.
+
+    Compiled filters are shared between requests with the same
+    signature and must not be modified. Because the values are sorted,
+    equal selections also share their entries in the elastic filter
+    cache.
+    """
+    filters = []
+    for field, values in signature:
+        if values:
+            filters.append({'terms': {field: list(values)}})
+    return tuple(filters)
+
+
+class RawJSON(str):
+    """
+    A value that is already serialized to JSON
+    """
+
+
+def dumps(data: dict) -> str:
+    """
+    json.dumps for response dicts, RawJSON values are
+    inserted as they are
+    """
+    raw = {key: value for key, value in data.items()
+           if isinstance(value, RawJSON)}
+    if not raw:
+        return json.dumps(data)
+    result = json.dumps(
+        {key: value for key, value in data.items() if key not in raw})
+    items = [f'{json.dumps(key)}: {value}' for key, value in raw.items()]
+    if result != '{}':
+        items.insert(0, result[1:-1])
+    return '{' + ', '.join(items) + '}'
+
+
+# The framing of a hits response with only _source and sort,
+# as returned with RAW_FILTER_PATH
+RAW_HITS_START = re.compile(r'\{"hits":\{"total":(\d+),"hits":\[\{"_source":')
+RAW_HITS_END = '}]}}'
+RAW_HIT_SEPARATOR = '},{"_source":'
+RAW_SORT = ',"sort":['
+RAW_FILTER_PATH = ','.join([
+    'responses.error',
+    'responses.hits.total',
+    'responses.hits.hits._source',
+    'responses.hits.hits.sort',
+    'responses.aggregations',
+])
+
+
+def splice_raw_hits(text: str, sorted_hits: bool) -> dict:
+    """
+    Takes the _source of every hit out of the text of a hits
+    response without decoding them. Returns the total, the
+    sources as a RawJSON list and the sort values of the last hit.
 
+    The _source of a hit can not contain the separator between
+    hits, quotes inside JSON strings are always escaped.
+    """
+    match = RAW_HITS_START.match(text)
+    if not match or not text.endswith(RAW_HITS_END):
+        # No hits, or an error. Small enough to decode.
+        response = json.loads(text)
+        if 'error' in response:
+            return response
+        hits = response['hits'].get('hits', [])
+        return {
+            'hits': {'total': response['hits']['total']},
+            'raw_sources': RawJSON(json.dumps(
+                [hit['_source'] for hit in hits])),
+            'last_sort': hits[-1].get('sort') if hits else None,
+            'hit_count': len(hits),
         }
-        item.update(res)
+
+    sources = text[match.end():-len(RAW_HITS_END)].split(RAW_HIT_SEPARATOR)
+    last_sort = None
+    if sorted_hits:
+        # The sort values follow the _source of each hit
+        last = sources[-1]
+        last_sort = json.loads(last[last.rfind(RAW_SORT) + len(RAW_SORT) - 1:])
+        sources = [source[:source.rfind(RAW_SORT)] for source in sources]
+    return {
+        'hits': {'total': int(match.group(1))},
+        'raw_sources': RawJSON('[' + ','.join(sources) + ']'),
+        'last_sort': last_sort,
+        'hit_count': len(sources),
+    }
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """
+    Whether If-None-Match holds the ETag, compared weakly as HTTP
+    prescribes. GZipMiddleware makes the ETag of compressed responses
+    weak, clients send that weak ETag back.
+    """
+    etags = parse_etags(if_none_match)
+    if etags == ['*']:
+        return True
+    return strong_etag(etag) in (strong_etag(tag) for tag in etags)
+
+
+def strong_etag(etag: str) -> str:
+    """
+    The ETag without the W/ prefix of a weak ETag
+    """
+    return etag[2:] if etag.startswith('W/') else etag
 
 
 class InvalidParameter(Exception):
@@ -107,6 +292,36 @@ class SingleDispatchMixin(object):
     """
     # Allowed methods
     http_methods_allowed = ['GET', 'POST', 'OPTIONS']
+    # Cache-Control directives, e.g. {'public': True, 'max_age': 60}
+    cache_control = {}
+    # The admission lane of the requests, see admission.py
+    admission_lane = 'interactive'
+
+    def lane(self, **kwargs) -> str:
+        """
+        The admission lane of the current request
+        """
+        return self.admission_lane
+
+    def estimated_cost(self) -> int:
+        """
+        The number of admission slots the current request takes
+        """
+        return 1
+
+    def check_permissions(self, request):
+        """
+        Raises PermissionDenied when the request may not use the view.
+        Runs before a conditional request is answered with 304.
+        """
+        pass
+
+    def etag(self):
+        """
+        The ETag of the response to the current request,
+        None when the response has no ETag
+        """
+        return None
 
     def dispatch(self, request, *args, **kwargs):
         """
@@ -120,23 +335,52 @@ class SingleDispatchMixin(object):
                                                                  **kwargs)
             if self.request.method in self.http_methods_allowed:
                 self.request_parameters = getattr(request, request.method)
-                data = self.handle_request(request, *args, **kwargs)
-                return self.render_to_response(request, data)
+                self.check_permissions(request)
+                etag = self.etag()
+                if etag and etag_matches(
+                        etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+                    response = HttpResponseNotModified()
+                else:
+                    ticket = admission.admit(
+                        self.lane(**kwargs), self.estimated_cost())
+                    try:
+                        data = self.handle_request(request, *args, **kwargs)
+                        response = self.render_to_response(request, data)
+                    except Exception:
+                        ticket.close()
+                        raise
+                    if response.streaming:
+                        # Keep the slots until the response is sent
+                        response._closable_objects.append(ticket)
+                    else:
+                        ticket.close()
+                if etag:
+                    response['ETag'] = etag
+                if self.cache_control:
+                    patch_cache_control(response, **self.cache_control)
+                return response
 
             return self.http_method_not_allowed(request, *args, **kwargs)
         except Exception as exc:
-            if isinstance(exc, InvalidParameter):
+            if isinstance(exc, (InvalidParameter, admission.TooCostly)):
                 response = {
                     'message': 'Bad Request (400)',
                     'detail': str(exc)
                 }
                 return HttpResponseBadRequest(json.dumps(response), content_type='application/json')
+            elif isinstance(exc, admission.Saturated):
+                response = HttpResponse(json.dumps({
+                    'message': 'Too Many Requests (429)',
+                    'detail': str(exc)
+                }), content_type='application/json', status=429)
+                response['Retry-After'] = exc.retry_after
+                return response
             else:
                 raise exc
 
 
     def render_to_response(self, request, response):
-        return HttpResponse(json.dumps(response),
+        return HttpResponse(dumps(response),
                             content_type='application/json')
 
 
@@ -160,7 +404,36 @@ class ElasticSearchMixin(object):
          'es_query_type': 'geo_polygon'}
     ]
     keyword_mapping = {}
+    # The available facets, facet name: elastic field
+    facets = {}
     request = None
+    # The endpoint class, used to pick the request timeout
+    elastic_endpoint = 'search'
+    # Scopes that can change the response, part of the cache key
+    authorization_scopes = ()
+    # Keep results in the search result cache
+    use_cache = True
+    # Keep them in the in-process tier as well, see cache.py
+    cache_locally = True
+    # Answer GET requests with an ETag and If-None-Match with a 304
+    conditional = True
+    # Parameters that only change which page of hits is returned
+    pagination_parameters = ('page', 'page_size', 'size', 'cursor')
+    # Parameters that only change which facets are returned
+    facet_parameters = ('aggs',)
+    # Parameters that only change which fields of the hits are returned
+    projection_parameters = ('fields',)
+    # The elastic document, its fields can be selected with fields=
+    document = None
+    # The _source returned by default, e.g. {'include': [...]} or
+    # {'exclude': [...]}. None returns the whole document.
+    default_source = None
+    # Fields that are always returned because the view needs them
+    required_fields = ()
+
+    @property
+    def elastic(self):
+        return get_client()
 
     def elastic_query(self, query):
         raise NotImplementedError
@@ -172,6 +445,80 @@ class ElasticSearchMixin(object):
         """
         return query
 
+    def add_next_cursor(self, elastic_data: dict, query: dict,
+                        hit_count: int, last_sort: list):
+        """
+        Adds a cursor for the next page to the results
+        By default it does nothing
+        """
+        pass
+
+    def use_raw_hits(self) -> bool:
+        """
+        Whether the hits can be passed on without decoding them,
+        which is only possible when no python code processes them
+        """
+        return False
+
+    def requested_facets(self):
+        """
+        The facets selected with the aggs parameter, a comma
+        separated list of facet names. All facets are returned
+        when the parameter is missing, none for aggs=none.
+        """
+        names = self.list_parameter('aggs')
+        if names is None:
+            return None
+        if names == ['none']:
+            return []
+
+        unknown = [name for name in names if name not in self.facets]
+        if unknown:
+            raise InvalidParameter(
+                f"Invalid aggs {', '.join(unknown)}. "
+                f"Should be none or one of {', '.join(self.facets)}")
+        return names
+
+    def list_parameter(self, name: str):
+        """
+        The names in a comma separated, possibly repeated,
+        parameter. None when the parameter is missing.
+        """
+        if hasattr(self.request_parameters, 'getlist'):
+            values = self.request_parameters.getlist(name)
+        else:
+            values = [self.request_parameters.get(name)]
+        values = [value for value in values if value is not None]
+        if not values:
+            return None
+
+        names = []
+        for value in values:
+            for item in value.split(','):
+                item = item.strip()
+                if item and item not in names:
+                    names.append(item)
+        return names
+
+    def add_source_projection(self, query: dict) -> dict:
+        """
+        Limits the _source of the hits to the fields selected with
+        the fields parameter, or to the default projection of the view
+        """
+        fields = self.list_parameter('fields')
+        if fields:
+            available = self.document._doc_type.mapping \
+                if self.document else ()
+            unknown = [field for field in fields if field not in available]
+            if unknown:
+                raise InvalidParameter(
+                    f"Invalid fields {', '.join(unknown)}")
+            query['_source'] = {
+                'include': sorted(set(fields) | set(self.required_fields))}
+        elif self.default_source and '_source' not in query:
+            query['_source'] = dict(self.default_source)
+        return query
+
     def add_page_counters(self, object_count: int) -> dict:
         count = {
             'page_count': object_count // self.preview_size
@@ -204,62 +551,37 @@ class ElasticSearchMixin(object):
 
         return self.handle_query_size_offset(query)
 
-    def _bool_query(self, filters: list, filter_keyword: str, values: list):
-        """
-        Deal with Multi value filter.
-        """
-        terms = []
-
-        for xvalue in values:
-            terms.append({
-                'term': self.get_term_and_value(
-                    filter_keyword, xvalue)})
-
-        filters.append({'bool': {"should": terms}})
-
-    def _convert_value_to_list(self, value):
-        """
-        Convert value safely to Python literal structures:
-        strings, numbers, tuples, lists, dicts, booleans, and None.
-        """
-        try:
-            value = ast.literal_eval(value)
-            return value
-        except (SyntaxError, ValueError):
-            pass
-
-        return value
-
-    def _build_filter(self, filters, filter_keyword, value):
+    @staticmethod
+    def _parameter_values(request_parameters, name: str) -> tuple:
         """
-        Build term / bool filter for keyword
+        All values of a (possibly repeated) request parameter
         """
-        value = self._convert_value_to_list(value)
-
-        if isinstance(value, list):
-            self._bool_query(filters, filter_keyword, value)
-            return
-
-        filters.append({
-            'term': self.get_term_and_value(
-                filter_keyword, value)})
+        if hasattr(request_parameters, 'getlist'):
+            return tuple(request_parameters.getlist(name))
+        value = request_parameters.get(name, None)
+        return () if value is None else (value,)
 
     def _add_keyword_filters(self, request_parameters, filters):
         """add keyword filters"""
+        signature = []
 
         # Checking for known keyword filters
-        for filter_keyword in self.keywords:
-            value = request_parameters.get(filter_keyword, None)
-            # Since a parameter can be 0, which evalutes to False, a check
-            # is actually made that the value is not None
-            if value is None:
-                continue
-
-            self._build_filter(filters, filter_keyword, value)
+        for filter_keyword in self.keywords or ():
+            values = self._parameter_values(request_parameters, filter_keyword)
+            if values:
+                signature.append((
+                    self.get_filter_field(filter_keyword),
+                    parse_filter_values(values)))
 
         # add custom filter
         for filter_keyword, value in self.filters.items():
-            self._build_filter(filters, filter_keyword, value)
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            signature.append((
+                self.get_filter_field(filter_keyword),
+                parse_filter_values(tuple(str(val) for val in value))))
+
+        filters.extend(compile_filters(tuple(signature)))
 
     def _add_geo_filters(self, request_parameters, filters):
         """ Adding geo filters """
@@ -297,6 +619,106 @@ class ElasticSearchMixin(object):
                             }
                         })
 
+    def estimated_cost(self) -> int:
+        """
+        The number of admission slots the current request takes.
+        Polygons with many points and deep pages cost more, see
+        settings.ADMISSION_SHAPE_POINTS_PER_SLOT and
+        settings.ADMISSION_WINDOW_PER_SLOT.
+        """
+        cost = 1
+        for geo_dict in self.geo_fields:
+            value = self.request_parameters.get(geo_dict['query_param'], None)
+            try:
+                points = json.loads(value) if value else []
+            except ValueError:
+                points = []
+            if isinstance(points, list):
+                cost += len(points) // settings.ADMISSION_SHAPE_POINTS_PER_SLOT
+
+        try:
+            page = int(self.request_parameters.get('page', 1))
+            size = int(self.request_parameters.get(
+                'size', self.request_parameters.get(
+                    'page_size', getattr(self, 'preview_size', None) or 0)))
+        except ValueError:
+            # Rejected when the query is built
+            return cost
+        return cost + page * size // settings.ADMISSION_WINDOW_PER_SLOT
+
+    def canonical_parameters(self) -> list:
+        """
+        Returns the request parameters as a sorted list of
+        (name, values) pairs. Values of keyword filters are
+        normalized, so a multi value filter has the same
+        representation regardless of the order of its values.
+        """
+        parameters = []
+        for name in sorted(self.request_parameters.keys()):
+            if name in (self.keywords or ()):
+                values = list(parse_filter_values(
+                    self._parameter_values(self.request_parameters, name)))
+            elif hasattr(self.request_parameters, 'getlist'):
+                values = self.request_parameters.getlist(name)
+            else:
+                values = [self.request_parameters[name]]
+            parameters.append((name, values))
+        return parameters
+
+    def authorization_scope(self) -> list:
+        """
+        The scopes of the request that are relevant for this view
+        """
+        return [
+            scope for scope in self.authorization_scopes
+            if self.request.is_authorized_for(scope)]
+
+    def cache_key(self, part: str, ignore=()):
+        """
+        The cache key of a part of the response. Parameters
+        in ignore do not influence this part. None when the
+        generation of the index is unknown, a key without it
+        would outlive a rebuild of the index.
+        """
+        generation = index_meta.generation(
+            settings.ELASTIC_INDICES[self.index])
+        if not generation:
+            return None
+        parameters = [
+            (name, values) for name, values in self.canonical_parameters()
+            if name not in ignore]
+        return cache.make_key(
+            type(self).__name__,
+            part,
+            self.index,
+            generation,
+            self.authorization_scope(),
+            parameters)
+
+    def etag(self):
+        """
+        The ETag depends on the generation of the index and the
+        canonical request, like the cache keys. A request for an
+        unchanged index is answered without calling elastic.
+        """
+        if not self.conditional or self.request.method != 'GET':
+            return None
+        key = self.cache_key('response')
+        return quote_etag(key) if key else None
+
+    def cached(self, load, key: str):
+        """
+        Returns the result of load() from the search result cache,
+        calling it only when the result is not cached yet
+        """
+        if not self.use_cache or not key:
+            return load()
+        data = cache.get(key, self.cache_locally)
+        if data is None:
+            data = load()
+            cache.set(key, data, self.cache_locally)
+        return data
+
     def load_from_elastic(self):
         """
         Loads the data from elastic.
@@ -316,15 +738,42 @@ class ElasticSearchMixin(object):
 
         # Building the query
         q = self.elastic_query(query_string)
-        query = self.add_elastic_filters(q)
-        # Performing the search
-        response = self.elastic.search(
-            index=settings.ELASTIC_INDICES[self.index], body=query)
+        query = self.add_source_projection(self.add_elastic_filters(q))
+
+        # The hits and the facets are separate searches. Facets do
+        # not depend on the page, so paging reuses the cached facets.
+        searches = {
+            'hits': (
+                self.cache_key('hits', self.facet_parameters),
+                self.check_plan(plan_query(query, 'table'), 'table')
+            )
+        }
+        if 'aggs' in query:
+            searches['facets'] = (
+                self.cache_key(
+                    'facets',
+                    self.pagination_parameters + self.projection_parameters),
+                self.check_plan(plan_query(query, 'facets'), 'facets')
+            )
+        if self.use_raw_hits():
+            responses = self.multi_search(searches, raw='hits')
+            hits = responses['hits']
+            object_list = hits['raw_sources']
+            hit_count, last_sort = hits['hit_count'], hits['last_sort']
+        else:
+            responses = self.multi_search(searches)
+            hits = responses['hits']['hits']['hits']
+            object_list = [item['_source'] for item in hits]
+            hit_count = len(hits)
+            last_sort = hits[-1].get('sort') if hits else None
+
+        aggs = responses['facets'].get('aggregations', {}) \
+            if 'facets' in responses else {}
         elastic_data = {
-            'aggs_list': self.process_aggs(response.get('aggregations', {})),
-            'object_list': [item['_source'] for item in
-                            response['hits']['hits']],
-            'object_count': response['hits']['total']}
+            'aggs_list': self.process_aggs(aggs),
+            'object_list': object_list,
+            'object_count': responses['hits']['hits']['total']}
+        self.add_next_cursor(elastic_data, query, hit_count, last_sort)
 
         try:
             elastic_data.update(
@@ -335,6 +784,113 @@ class ElasticSearchMixin(object):
 
         return elastic_data
 
+    @staticmethod
+    def check_plan(body: dict, role: str) -> dict:
+        """
+        Verifies the search body against the query plan of its role
+        when VERIFY_QUERY_PLANS is set, as it is in the tests
+        """
+        if settings.VERIFY_QUERY_PLANS:
+            verify_plan(body, role)
+        return body
+
+    def multi_search(self, searches: dict, raw=None) -> dict:
+        """
+        Performs several searches in a single _msearch request
+
+        searches - a dict of name: (cache key, query body), a
+            search without a cache key is never cached
+        raw - the name of a search whose hits are not decoded,
+            see splice_raw_hits
+
+        Responses found in the search result cache are not sent
+        to elastic. Returns a dict of name: response.
+        """
+        responses = {}
+        missing = []
+        for name, (key, _body) in searches.items():
+            response = cache.get(key) if self.use_cache and key else None
+            if response is None:
+                missing.append(name)
+            else:
+                responses[name] = response
+
+        if not missing:
+            return responses
+        if raw in missing:
+            # The raw search is the last one in the response
+            missing.remove(raw)
+            missing.append(raw)
+        else:
+            raw = None
+
+        index = settings.ELASTIC_INDICES[self.index]
+        body = []
+        for name in missing:
+            search = canonical_body(searches[name][1])
+            header = {
+                'index': index,
+                # Identical searches go to the same shard copies, where
+                # their results are in the shard request cache
+                'preference': hashlib.sha1(
+                    search.encode('utf-8')).hexdigest()[:16],
+            }
+            if searches[name][1].get('size') == 0:
+                header['request_cache'] = True
+            body.extend([json.dumps(header), search])
+
+        if raw:
+            result = self.raw_msearch(
+                body, len(missing) - 1, 'sort' in searches[raw][1])
+        else:
+            result = self.elastic.msearch(
+                body=body,
+                request_timeout=request_timeout(self.elastic_endpoint))
+
+        for name, response in zip(missing, result['responses']):
+            if 'error' in response:
+                error = response['error']
+                raise TransportError(
+                    response.get('status', 500),
+                    error.get('type') if isinstance(error, dict) else error,
+                    error)
+            responses[name] = response
+            if self.use_cache and searches[name][0]:
+                cache.set(searches[name][0], response)
+
+        return responses
+
+    def raw_msearch(self, body: list, decoded: int, sorted_hits: bool) -> dict:
+        """
+        Sends an _msearch request and reads the response text
+        without the client deserializer. The first decoded
+        responses are decoded, the hits of the last response are
+        spliced with splice_raw_hits.
+        """
+        text = raw_transport(self.elastic).perform_request(
+            'POST', '/_msearch',
+            headers={'content-type': 'application/x-ndjson'},
+            params={
+                'filter_path': RAW_FILTER_PATH,
+                'request_timeout': request_timeout(self.elastic_endpoint),
+            },
+            body='\n'.join(body) + '\n')
+
+        decoder = json.JSONDecoder()
+        text = text.strip()
+        prefix = '{"responses":['
+        if not text.startswith(prefix) or not text.endswith(']}'):
+            return json.loads(text)
+        position = len(prefix)
+        responses = []
+        for _i in range(decoded):
+            response, position = decoder.raw_decode(text, position)
+            responses.append(response)
+            # Skip the comma between responses
+            position += 1
+        responses.append(splice_raw_hits(text[position:-2], sorted_hits))
+        return {'responses': responses}
+
     def get_term_and_value(self, filter_keyword: str, val: str) -> dict:
         """
         Some fields need to be searched raw while others are analysed with
@@ -345,11 +901,14 @@ class ElasticSearchMixin(object):
         :return: a small dict that contains the key/value pair
                  to use in the ES search.
         """
-        # checking for keyword mapping to the actual elastic name
-        filter_keyword = self.keyword_mapping.get(
-            filter_keyword, filter_keyword)
+        return {self.get_filter_field(filter_keyword): val}
 
-        return {filter_keyword: val}
+    def get_filter_field(self, filter_keyword: str) -> str:
+        """
+        The elastic field a filter keyword searches on
+        """
+        # checking for keyword mapping to the actual elastic name
+        return self.keyword_mapping.get(filter_keyword, filter_keyword)
 
     def process_aggs(self, aggs):
         """
@@ -370,6 +929,17 @@ class ElasticSearchMixin(object):
             # Removing the individual count aggregation
             del aggs[key]
 
+        # Facets planned to return all buckets have no count
+        # aggregation, their bucket list is the exact count
+        for key, value in aggs.items():
+            if 'doc_count' in value or 'buckets' not in value:
+                continue
+            value['doc_count'] = len(value['buckets'])
+            if value.get('sum_other_doc_count'):
+                log.warning(
+                    "Facet %s is truncated, facet statistics of %s "
+                    "are out of date", key, self.index)
+
         return aggs
 
 
@@ -388,15 +958,16 @@ class TableSearchView(ElasticSearchMixin, SingleDispatchMixin, View):
     keyword_mapping = {}
     # request parameters
     request_parameters = None
+    # A unique field appended to the sort order to make
+    # search_after cursors unambiguous
+    sort_tiebreaker = None
+    # Pass the _source of the hits on without decoding them
+    raw_hits = True
 
     preview_size = settings.SEARCH_PREVIEW_SIZE  # type int
 
     def __init__(self):
         super(View, self).__init__()
-        self.elastic = Elasticsearch(
-            hosts=settings.ELASTIC_SEARCH_HOSTS, retry_on_timeout=True,
-            refresh=True
-        )
 
     def handle_request(self, request, *args, **kwargs):
         elastic_data = self.load_from_elastic()
@@ -414,6 +985,9 @@ class TableSearchView(ElasticSearchMixin, SingleDispatchMixin, View):
     def handle_query_size_offset(self, query: dict) -> dict:
         """
         Handles query size and offsets
+
+        When a cursor is given the page parameter is ignored and
+        the search resumes after the last hit of the previous page
         """
         # Adding sizing if not given. In bag we also accept page_size parameter
         size = self.request_parameters.get('size', self.request_parameters.get('page_size', None))
@@ -429,6 +1003,13 @@ class TableSearchView(ElasticSearchMixin, SingleDispatchMixin, View):
 
         if 'size' not in query and self.preview_size:
             query['size'] = self.preview_size
+
+        self.add_sort_tiebreaker(query)
+        cursor = self.request_parameters.get('cursor', None)
+        if cursor:
+            query['search_after'] = self.decode_cursor(cursor)
+            return query
+
         page = self.request_parameters.get('page', None)
         if page and self.preview_size:
             try:
@@ -444,6 +1025,56 @@ class TableSearchView(ElasticSearchMixin, SingleDispatchMixin, View):
                 query['from'] = offset
         return query
 
+    def add_sort_tiebreaker(self, query: dict):
+        """
+        Appends the unique tiebreaker field to the sort order of
+        the query so every hit has a distinct set of sort values
+        """
+        sort = query.get('sort')
+        if not sort or not self.sort_tiebreaker:
+            return
+        if isinstance(sort, dict):
+            sort = [{field: order} for field, order in sort.items()]
+        query['sort'] = list(sort) + [
+            {self.sort_tiebreaker: {'order': 'asc'}}]
+
+    def encode_cursor(self, sort_values: list) -> str:
+        """
+        Creates an opaque cursor from the sort values of a hit
+        """
+        cursor = json.dumps({'i': self.index, 's': sort_values})
+        return base64.urlsafe_b64encode(
+            cursor.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor: str) -> list:
+        """
+        Returns the sort values to search after from a cursor
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded))
+            sort_values = data['s']
+            valid = data['i'] == self.index and isinstance(sort_values, list)
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            valid = False
+        if not valid:
+            raise InvalidParameter(f"Invalid cursor {cursor}")
+        return sort_values
+
+    def add_next_cursor(self, elastic_data: dict, query: dict,
+                        hit_count: int, last_sort: list):
+        """
+        Adds the cursor of the next page when the current page is full
+        """
+        if not last_sort or hit_count < query.get('size', 0):
+            return
+        elastic_data['next'] = self.encode_cursor(last_sort)
+
+    def use_raw_hits(self) -> bool:
+        # Views that filter the hits need them decoded
+        return self.raw_hits and \
+            type(self).filter_data is TableSearchView.filter_data
+
     def filter_data(self, elastic_data, request):
         """
         Allow implementations to do additional filtering based on
@@ -465,38 +1096,342 @@ class GeoLocationSearchView(ElasticSearchMixin, SingleDispatchMixin, View):
     """
     # To overwrite methods
     index = 'DS_INDEX'  # type: str
+    elastic_endpoint = 'geolocation'
+    admission_lane = 'geolocation'
+    # Geolocations can hold every selected location
+    cache_locally = False
+    # The geo_point field with the location of a document
+    location_field = 'centroid'
+    # Compact output formats, selected with the format parameter.
+    # Without it the elastic hits are returned. Clusters, see
+    # load_clusters, are columns with counts or geojson features with
+    # a count property. Binary buffers hold no counts, so binary can
+    # not be combined with a zoom level that clusters.
+    formats = {
+        'columns': 'application/json',
+        'binary': 'application/octet-stream',
+        'geojson': 'application/geo+json',
+    }
 
     def __init__(self):
         super(View, self).__init__()
         self.request_parameters = None
-        self.elastic = Elasticsearch(
-            hosts=settings.ELASTIC_SEARCH_HOSTS, retry_on_timeout=True,
-            refresh=True
-        )
+
+    def requested_format(self):
+        """
+        The output format asked for, None for the elastic hits
+        """
+        output_format = self.request_parameters.get('format', None)
+        if output_format is not None and output_format not in self.formats:
+            raise InvalidParameter(
+                f"Invalid format {output_format}. "
+                f"Should be one of {', '.join(self.formats)}")
+        return output_format
+
+    def requested_zoom(self):
+        """
+        The map zoom level asked for, None when not given
+        """
+        zoom = self.request_parameters.get('zoom', None)
+        if zoom is None:
+            return None
+        try:
+            zoom = int(zoom)
+        except ValueError:
+            raise InvalidParameter(f"Invalid zoom {zoom}")
+        if not 0 <= zoom <= 24:
+            raise InvalidParameter(
+                f"Invalid zoom {zoom}. Should be between 0 and 24")
+        return zoom
+
+    @staticmethod
+    def requested_bbox(request_parameters):
+        """
+        The west, south, east, north of the bbox parameter,
+        None when not given
+        """
+        bbox = request_parameters.get('bbox', None)
+        if bbox is None:
+            return None
+        try:
+            west, south, east, north = (
+                float(value) for value in bbox.split(','))
+        except ValueError:
+            raise InvalidParameter(
+                f"Invalid bbox {bbox}. Should be west,south,east,north")
+        if west >= east or south >= north:
+            raise InvalidParameter(
+                f"Invalid bbox {bbox}. Should be west,south,east,north")
+        return west, south, east, north
+
+    def selection_bbox(self, request_parameters):
+        """
+        The west, south, east, north the locations are selected in,
+        None for no limit
+        """
+        return self.requested_bbox(request_parameters)
+
+    def _add_geo_filters(self, request_parameters, filters):
+        super()._add_geo_filters(request_parameters, filters)
+        bbox = self.selection_bbox(request_parameters)
+        if bbox:
+            west, south, east, north = bbox
+            filters.append({
+                'geo_bounding_box': {
+                    self.location_field: {
+                        'top_left': {'lat': north, 'lon': west},
+                        'bottom_right': {'lat': south, 'lon': east},
+                    }
+                }
+            })
+
+    @staticmethod
+    def geohash_precision(zoom: int) -> int:
+        """
+        The geohash precision giving a few cells per map tile
+        at the zoom level, e.g. 5 (~5km) at zoom 10
+        """
+        return max(1, min(12, zoom // 2))
 
     def handle_request(self, request, *args, **kwargs):
         """
         Handling the request for goelocation information
         """
+        zoom = self.requested_zoom()
+        if self.requested_format() == 'binary' and zoom is not None and \
+                zoom < settings.GEO_CLUSTER_MAX_ZOOM:
+            raise InvalidParameter(
+                f"Format binary needs a zoom of at least "
+                f"{settings.GEO_CLUSTER_MAX_ZOOM}, or no zoom")
+        return self.cached(
+            self.load_geolocation, self.cache_key('geolocation'))
+
+    def load_geolocation(self):
         # looking for a query
         query_string = self.request_parameters.get('query', None)
 
         # Building the query
         q = self.elastic_query(query_string)
         query = self.add_elastic_filters(q)
+
+        zoom = self.requested_zoom()
+        if zoom is not None and zoom < settings.GEO_CLUSTER_MAX_ZOOM:
+            clusters = self.load_clusters(query, zoom)
+            if clusters is not None:
+                return self.format_clusters(clusters)
+
+        output_format = self.requested_format()
+        if output_format:
+            columns = self.load_columns(query)
+            if output_format == 'binary':
+                return self.build_binary(columns)
+            if output_format == 'geojson':
+                return self.build_geojson(columns)
+            return columns
+
+        query = plan_query(query, 'geolocation')
         # Removing size limit
         query['size'] = settings.MAX_SEARCH_ITEMS
         # Performing the search
         response = self.elastic.search(
             index=settings.ELASTIC_INDICES[self.index],
-            body=query,
-            _source_include=['centroid']
+            body=self.check_plan(query, 'geolocation'),
+            _source_include=['centroid'],
+            request_timeout=request_timeout(self.elastic_endpoint)
         )
         data = self.build_response(response)
 
         log.info('response count %s', data['object_count'])
         return data
 
+    def load_columns(self, query: dict) -> dict:
+        """
+        The ids and locations of the selected documents, read from
+        doc values, see build_columns
+        """
+        query = plan_query(query, 'geolocation')
+        query['size'] = settings.MAX_SEARCH_ITEMS
+        query['_source'] = False
+        query['docvalue_fields'] = [self.location_field]
+        response = self.elastic.search(
+            index=settings.ELASTIC_INDICES[self.index],
+            body=self.check_plan(query, 'geolocation'),
+            filter_path=['hits.total', 'hits.hits._id', 'hits.hits.fields'],
+            request_timeout=request_timeout(self.elastic_endpoint)
+        )
+        columns = self.build_columns(response)
+        log.info('response count %s', columns['object_count'])
+        return columns
+
+    def load_clusters(self, query: dict, zoom: int):
+        """
+        Groups all selected locations in geohash cells sized for the
+        zoom level. Returns the cells as columns with the number of
+        locations and their centroid per cell, or None when few enough
+        locations are selected to send them one by one.
+
+        A grid of more than GEO_CLUSTER_MAX_CELLS cells, a wide
+        selection at a high zoom, is truncated to the fullest cells.
+        One cell more is requested to tell when that happens.
+        """
+        max_cells = settings.GEO_CLUSTER_MAX_CELLS
+        query = plan_query(query, 'clusters')
+        query['aggs'] = {
+            'clusters': {
+                'geohash_grid': {
+                    'field': self.location_field,
+                    'precision': self.geohash_precision(zoom),
+                    'size': max_cells + 1,
+                },
+                'aggs': {
+                    'centroid': {
+                        'geo_centroid': {'field': self.location_field}
+                    }
+                }
+            }
+        }
+        response = self.elastic.search(
+            index=settings.ELASTIC_INDICES[self.index],
+            body=self.check_plan(query, 'clusters'),
+            request_timeout=request_timeout(self.elastic_endpoint)
+        )
+        object_count = response['hits']['total']
+        if object_count <= settings.GEO_CLUSTER_MIN_POINTS:
+            return None
+
+        buckets = response['aggregations']['clusters']['buckets']
+        truncated = len(buckets) > max_cells
+        if truncated:
+            log.warning('%s clusters truncated to %s cells at zoom %s',
+                        self.index, max_cells, zoom)
+            buckets = buckets[:max_cells]
+        columns = {
+            'object_count': object_count,
+            'truncated': truncated,
+            'ids': [bucket['key'] for bucket in buckets],
+            'lons': [bucket['centroid']['location']['lon']
+                     for bucket in buckets],
+            'lats': [bucket['centroid']['location']['lat']
+                     for bucket in buckets],
+            'counts': [bucket['doc_count'] for bucket in buckets],
+        }
+        log.info('response count %s in %s clusters',
+                 object_count, len(buckets))
+        return columns
+
+    def format_clusters(self, columns: dict) -> dict:
+        """
+        The clusters in the requested format
+        """
+        output_format = self.requested_format()
+        if output_format == 'geojson':
+            return self.build_geojson(columns)
+        if output_format:
+            # The columns, with the counts
+            return columns
+        return {
+            'object_count': columns['object_count'],
+            'truncated': columns['truncated'],
+            'cluster_list': [{
+                'geohash': geohash,
+                'count': count,
+                'centroid': [lon, lat],
+            } for geohash, lon, lat, count in zip(
+                columns['ids'], columns['lons'], columns['lats'],
+                columns['counts'])]
+        }
+
+    def render_to_response(self, request, response):
+        output_format = self.requested_format()
+        if isinstance(response, bytes):
+            return HttpResponse(
+                response, content_type=self.formats['binary'])
+        if output_format:
+            content_type = self.formats[
+                'geojson' if output_format == 'geojson' else 'columns']
+            return HttpResponse(
+                json.dumps(response, separators=(',', ':')),
+                content_type=content_type)
+        return super().render_to_response(request, response)
+
+    @staticmethod
+    def _lon_lat(value):
+        """
+        The lon, lat of a geo_point doc value, which elastic
+        returns as an object, a "lat,lon" string or a [lon, lat] array
+        """
+        if isinstance(value, dict):
+            return value['lon'], value['lat']
+        if isinstance(value, str):
+            lat, lon = value.split(',')
+            return float(lon), float(lat)
+        return value[0], value[1]
+
+    def build_columns(self, response) -> dict:
+        """
+        The ids and coordinates of the hits as three lists
+        """
+        ids, lons, lats = [], [], []
+        for hit in response['hits'].get('hits', []):
+            values = hit.get('fields', {}).get(self.location_field)
+            if not values:
+                continue
+            lon, lat = self._lon_lat(values[0])
+            ids.append(hit['_id'])
+            lons.append(lon)
+            lats.append(lat)
+        return {
+            'object_count': response['hits']['total'],
+            'ids': ids,
+            'lons': lons,
+            'lats': lats,
+        }
+
+    @staticmethod
+    def build_binary(columns: dict) -> bytes:
+        """
+        Packs the columns in a buffer of
+        - the number of points n, uint32
+        - n longitudes, float32
+        - n latitudes, float32
+        - n ids, utf-8 separated by newlines
+        all little-endian
+        """
+        count = len(columns['ids'])
+        return b''.join([
+            struct.pack(f'<I{count}f{count}f',
+                        count, *columns['lons'], *columns['lats']),
+            '\n'.join(columns['ids']).encode('utf-8'),
+        ])
+
+    @staticmethod
+    def build_geojson(columns: dict) -> dict:
+        """
+        A FeatureCollection of points with quantized coordinates,
+        clusters have the number of locations as count property
+        """
+        precision = settings.GEOJSON_PRECISION
+        features = [{
+            'type': 'Feature',
+            'id': object_id,
+            'geometry': {
+                'type': 'Point',
+                'coordinates': [
+                    round(lon, precision), round(lat, precision)],
+            },
+        } for object_id, lon, lat in zip(
+            columns['ids'], columns['lons'], columns['lats'])]
+        for feature, count in zip(features, columns.get('counts', ())):
+            feature['properties'] = {'count': count}
+        collection = {
+            'type': 'FeatureCollection',
+            'object_count': columns['object_count'],
+            'features': features,
+        }
+        if 'truncated' in columns:
+            collection['truncated'] = columns['truncated']
+        return collection
+
     @staticmethod
     def build_response(response):
 
@@ -507,6 +1442,71 @@ class GeoLocationSearchView(ElasticSearchMixin, SingleDispatchMixin, View):
         return resp
 
 
+class VectorTileView(GeoLocationSearchView):
+    """
+    The selected locations in a Mapbox vector tile, with the url
+    parameters z, x and y of the tile. Below GEO_CLUSTER_MAX_ZOOM
+    the locations are clustered like in the geolocation view.
+
+    Tiles are cached on disk, keyed on the index generation, the
+    canonical request and the tile.
+    """
+    # The name of the layer in the tile
+    layer = 'dataselectie'
+
+    def tile(self) -> tuple:
+        """
+        The z, x, y of the requested tile
+        """
+        z, x, y = (int(self.kwargs[name]) for name in ('z', 'x', 'y'))
+        if z > 24 or x >= 2 ** z or y >= 2 ** z:
+            raise InvalidParameter(f"Invalid tile {z}/{x}/{y}")
+        return z, x, y
+
+    def selection_bbox(self, request_parameters):
+        return mvt.tile_bounds(*self.tile())
+
+    def cache_key(self, part: str, ignore=()) -> str:
+        z, x, y = self.tile()
+        return super().cache_key(f'{part}/{z}/{x}/{y}', ignore)
+
+    def cached(self, load, key: str):
+        if not self.use_cache or not key:
+            return load()
+        tiles = caches[cache.TILES]
+        tile = tiles.get(key)
+        if tile is None:
+            tile = load()
+            tiles.set(key, tile)
+        return tile
+
+    def handle_request(self, request, *args, **kwargs):
+        return self.cached(self.load_tile, self.cache_key('tile'))
+
+    def load_tile(self) -> bytes:
+        query_string = self.request_parameters.get('query', None)
+        query = self.add_elastic_filters(self.elastic_query(query_string))
+
+        z, x, y = self.tile()
+        clusters = None
+        if z < settings.GEO_CLUSTER_MAX_ZOOM:
+            clusters = self.load_clusters(query, z)
+        if clusters is None:
+            columns = self.load_columns(query)
+            properties = ({'id': object_id} for object_id in columns['ids'])
+        else:
+            columns = clusters
+            properties = ({'count': count} for count in columns['counts'])
+
+        return mvt.encode(self.layer, [
+            mvt.tile_position(z, x, y, lon, lat) + (point_properties,)
+            for lon, lat, point_properties in zip(
+                columns['lons'], columns['lats'], properties)])
+
+    def render_to_response(self, request, response):
+        return HttpResponse(response, content_type=mvt.CONTENT_TYPE)
+
+
 class CSVExportView(TableSearchView):
     """
     A base class to generate csv exports
@@ -517,6 +1517,167 @@ class CSVExportView(TableSearchView):
     field_names = []
     # The pretty version of the headers
     csv_headers = []
+    elastic_endpoint = 'export'
+    admission_lane = 'export'
+    # Exports are streamed, not cached. The state of an export job
+    # changes while it runs, proxies must not keep it either.
+    use_cache = False
+    conditional = False
+    cache_control = {'no_store': True}
+    # Exports are read in settings.EXPORT_SLICES slices at once, which
+    # gives the rows in no particular order. An ordered export is read
+    # in one scroll that keeps the sort of elastic_query.
+    ordered = False
+    # Serve the exports of the whole index and of a single value of
+    # prebuilt_parameter from the files written when the index was
+    # built, see prebuilt.py
+    prebuilt = False
+    prebuilt_parameter = 'stadsdeel_naam'
+    # Output formats, format: (content type, file extension). Formats
+    # other than csv have typed columns, see columnar.py
+    export_formats = {
+        'csv': ('text/csv', 'csv'),
+        'ndjson': ('application/x-ndjson', 'ndjson'),
+        'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+        'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    }
+    export_format = 'csv'
+    # Where a resumable export starts, see resumable.py
+    resume = None
+    # Types of the export columns that are not in the document mapping
+    computed_column_types = {
+        'geometrie_rd_x': 'integer',
+        'geometrie_rd_y': 'integer',
+        'geometrie_wgs_lat': 'float',
+        'geometrie_wgs_lon': 'float',
+    }
+
+    def lane(self, **kwargs) -> str:
+        # Export jobs run in their own processes, which take the
+        # export slots, see export_jobs.run. Starting one and
+        # polling its status are cheap, like a preflight
+        if 'job_id' in kwargs or 'preflight' in kwargs or \
+                self.request_parameters.get(export_jobs.ASYNC_PARAMETER):
+            return 'interactive'
+        return super().lane(**kwargs)
+
+    def requested_export_format(self) -> str:
+        export_format = self.request_parameters.get('format', 'csv')
+        if export_format not in self.export_formats:
+            raise InvalidParameter(
+                f"Invalid format {export_format}. "
+                f"Should be one of {', '.join(self.export_formats)}")
+        if export_format in ('arrow', 'parquet') and not columnar.pyarrow:
+            raise InvalidParameter(f"Format {export_format} is not available")
+        return export_format
+
+    def column_types(self) -> dict:
+        """
+        The elastic type of every export column
+        """
+        mapping = self.document._doc_type.mapping if self.document else {}
+        types = {}
+        for field in self.field_names:
+            if field in self.computed_column_types:
+                types[field] = self.computed_column_types[field]
+            elif field in mapping:
+                types[field] = getattr(mapping[field], 'name', 'keyword')
+            else:
+                types[field] = 'keyword'
+        return types
+
+    def column_batches(self, request, es_generator):
+        """
+        The export rows in batches of DOWNLOAD_BATCH, each batch
+        a dict of field: list of typed values
+        """
+        types = self.column_types()
+
+        def columns(items):
+            return {
+                field: [
+                    columnar.typed_value(item.get(field), types[field])
+                    for item in items]
+                for field in self.field_names}
+
+        for batch in self.item_batches(request, es_generator):
+            yield columns(batch)
+
+    def prebuilt_name(self):
+        """
+        The name of the prebuilt export matching the request,
+        None when the request has other filters. Prebuilt exports
+        are CSV, so format=csv is no filter either.
+        """
+        names = [
+            name for name in self.request_parameters.keys()
+            if name not in self.pagination_parameters and name != 'format']
+        if not names:
+            return prebuilt.ALL
+        if names != [self.prebuilt_parameter]:
+            return None
+        values = parse_filter_values(self._parameter_values(
+            self.request_parameters, self.prebuilt_parameter))
+        if len(values) != 1:
+            return None
+        return prebuilt.selection_name(self.prebuilt_parameter, values[0])
+
+    def handle_request(self, request, *args, **kwargs):
+        """
+        Export jobs are answered from their state, see export_jobs.py.
+        The url of a job has its job_id, and download for its file.
+        The preflight url answers the estimated size of the export.
+        """
+        if 'job_id' in kwargs:
+            return export_jobs.find(
+                self, kwargs['job_id'], kwargs.get('download', False))
+        self.export_format = self.requested_export_format()
+        if kwargs.get('preflight'):
+            return self.estimate_export()
+        if self.request_parameters.get(export_jobs.ASYNC_PARAMETER) == 'true':
+            return export_jobs.submit(self)
+        if self.prebuilt and self.export_format == 'csv' and \
+                'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            name = self.prebuilt_name()
+            export = name and prebuilt.open_export(
+                settings.ELASTIC_INDICES[self.index], name)
+            if export:
+                return export
+        if self.is_resumable():
+            export_id = self.cache_key('export')
+            if export_id:
+                self.resume = resumable.start(
+                    request, export_id, quote_etag(export_id))
+        return super().handle_request(request, *args, **kwargs)
+
+    def estimate_export(self) -> dict:
+        """
+        The estimated rows, bytes and seconds of the export of the
+        request, see preflight.py
+        """
+        header = io.StringIO()
+        csv.writer(header, delimiter=';').writerow(self.csv_headers)
+        header_bytes = len(codecs.BOM_UTF8) + len(
+            header.getvalue().encode('utf-8'))
+        return preflight.estimate(
+            settings.ELASTIC_INDICES[self.index], self.count_rows(),
+            header_bytes, self.export_format)
+
+    def is_resumable(self) -> bool:
+        """
+        Whether the request asks for a resumable export. Only text
+        formats can be continued by appending the remaining rows.
+        """
+        return bool(self.sort_tiebreaker) and \
+            self.export_format in ('csv', 'ndjson') and \
+            self.request_parameters.get(resumable.PARAMETER) == 'true'
+
+    def export_etag(self) -> str:
+        """
+        The ETag of a resumable export, which depends on the
+        generation of the index like the cache keys
+        """
+        return quote_etag(self.cache_key('export'))
 
     def item_data_update(self, item, _request):
         """
@@ -525,6 +1686,78 @@ class CSVExportView(TableSearchView):
         """
         return item
 
+    def batch_data_update(self, items: list, _request):
+        """
+        Allow for subclasses to add custom fields to a whole batch
+        of items at once, after item_data_update
+        """
+        pass
+
+    def render_rows(self, items: list, request=None) -> list:
+        """
+        The CSV lines of the given _source items, as the CSV export
+        writes them. The index build stores these in export_row.
+        """
+        items = [self.item_data_update(item, request) for item in items]
+        self.batch_data_update(items, request)
+        return self.csv_lines(items)
+
+    def csv_lines(self, items: list) -> list:
+        """
+        The CSV lines of updated items, see item_batches
+        """
+        write_buffer = io.StringIO()
+        writer = csv.DictWriter(write_buffer, self.field_names, delimiter=';')
+        lines = []
+        for item in items:
+            # Making sure all the data is in string form
+            self.sanitize_fields(item, self.field_names)
+            # Only returning fields from the headers
+            writer.writerow(
+                {key: item.get(key, '') for key in self.field_names})
+            lines.append(write_buffer.getvalue())
+            write_buffer.seek(0)
+            write_buffer.truncate()
+        return lines
+
+    @cached_property
+    def export_rows(self) -> bool:
+        """
+        Whether the CSV lines are read from the export_row field
+        the documents stored when the index was built
+        """
+        return self.export_format == 'csv' and index_meta.export_rows(
+            settings.ELASTIC_INDICES[self.index])
+
+    def item_batches(self, request, es_generator):
+        """
+        The updated items of the export in batches of DOWNLOAD_BATCH
+        """
+        batch = []
+        for item_hit in es_generator:
+            batch.append(self.item_data_update(item_hit['_source'], request))
+            if len(batch) == settings.DOWNLOAD_BATCH:
+                self.batch_data_update(batch, request)
+                yield batch
+                batch = []
+        if batch:
+            self.batch_data_update(batch, request)
+            yield batch
+
+    def count_rows(self) -> int:
+        """
+        The number of rows in the export of the request
+        """
+        query_string = self.request_parameters.get('query', None)
+        query = plan_query(
+            self.add_elastic_filters(self.elastic_query(query_string)),
+            'count')
+        response = self.elastic.search(
+            index=settings.ELASTIC_INDICES[self.index],
+            body=self.check_plan(query, 'count'),
+            request_timeout=request_timeout(self.elastic_endpoint))
+        return response['hits']['total']
+
     def load_from_elastic(self) -> Generator:
         """
         Instead of normal results
@@ -534,23 +1767,49 @@ class CSVExportView(TableSearchView):
         # Building the query
         q = self.elastic_query(query_string)
         query = self.add_elastic_filters(q)
-        # Making sure there is no pagination
-        if query is not None and 'from' in query:
-            del query['from']
+        source = query.get('_source') or {}
+        if self.export_rows:
+            query['_source'] = ['export_row']
+        elif isinstance(source, dict) and 'include' not in source:
+            query['_source'] = dict(
+                source, exclude=list(source.get('exclude', ())) + ['export_row'])
+        if self.resume:
+            # A stable order, so a later request can search after
+            # the checkpoint of a page
+            if self.ordered:
+                self.add_sort_tiebreaker(query)
+            else:
+                query['sort'] = [{self.sort_tiebreaker: {'order': 'asc'}}]
+            query = plan_query(query, 'resumable_export')
+            return resumable.scan_pages(
+                self.elastic,
+                query=self.check_plan(query, 'resumable_export'),
+                index=settings.ELASTIC_INDICES[self.index],
+                resume=self.resume,
+                request_timeout=request_timeout(self.elastic_endpoint))
+        if self.ordered:
+            query = plan_query(query, 'sorted_export')
+            return scan(
+                self.elastic, query=self.check_plan(query, 'sorted_export'),
+                index=settings.ELASTIC_INDICES[self.index],
+                preserve_order=True,
+                request_timeout=request_timeout(self.elastic_endpoint))
+
+        # Without pagination, aggregations or sorting
+        query = plan_query(query, 'export')
         # Returning the elastic generator
-        return scan(
-            self.elastic, query=query,
-            index=settings.ELASTIC_INDICES[self.index])
+        return sliced_scan(
+            self.elastic, query=self.check_plan(query, 'export'),
+            index=settings.ELASTIC_INDICES[self.index],
+            slices=settings.EXPORT_SLICES,
+            request_timeout=request_timeout(self.elastic_endpoint))
 
     def result_generator(self, request, es_generator):
         """
         Generate the result set for the CSV eport
         """
-        batch_size = settings.DOWNLOAD_BATCH
-
         write_buffer = io.StringIO()  # The buffer to stream to
         writer = csv.DictWriter(write_buffer, self.field_names, delimiter=';')
-        more = True  # More results flag
 
         header_dict = {}  # A dict for the CSV headers
         for i in range(len(self.field_names)):
@@ -564,47 +1823,93 @@ class CSVExportView(TableSearchView):
             write_buffer.truncate()
             return buffer_data
 
-        # Yielding BOM for utf8 encoding
-        yield codecs.BOM_UTF8
-        # Yielding headers as first line
-        writer.writerow(header_dict)
-        yield read_and_empty_buffer()
-
-        # Yielding results in batches of batch_size
-        while more:
-            item_count = 0
-            # Collecting items for batch
-            for item_hit in es_generator:
-                item = item_hit['_source']
-                item_count += 1
-                # Allowing for custompdates
-                item = self.item_data_update(item, request)
-                # Making sure all the data is in string form
-                self.sanitize_fields(item, self.field_names)
-                resp = {}
-                # Only returning fields from the headers
-                for key in self.field_names:
-                    resp[key] = item.get(key, '')
-                writer.writerow(resp)
-                if item_count == batch_size:
-                    break
-
+        # A resumed export continues the rows of an earlier download
+        if not (self.resume and self.resume.offset):
+            # Yielding BOM for utf8 encoding
+            yield codecs.BOM_UTF8
+            # Yielding headers as first line
+            writer.writerow(header_dict)
             yield read_and_empty_buffer()
 
-            # Stop the run, if end is reached
-            more = item_count >= batch_size
+        if self.export_rows:
+            # The lines were rendered when the index was built
+            lines = (hit['_source'].get('export_row', '')
+                     for hit in es_generator)
+            while True:
+                batch = list(islice(lines, settings.DOWNLOAD_BATCH))
+                if not batch:
+                    break
+                yield ''.join(batch)
+            return
 
-        # Yielding (batch size) results
-        yield read_and_empty_buffer()
+        # Yielding results in batches of DOWNLOAD_BATCH
+        for batch in self.item_batches(request, es_generator):
+            yield ''.join(self.csv_lines(batch))
 
     def sanitize_fields(self, item, field_names):
         pass
 
+    def compressible(self) -> bool:
+        # Arrow and Parquet are binary, they hardly compress
+        return self.export_format in ('csv', 'ndjson')
+
+    def export_chunks(self, request, es_generator):
+        """
+        The uncompressed export of the hits in the requested format
+        """
+        if self.export_format == 'csv':
+            return self.result_generator(request, es_generator)
+        return columnar.WRITERS[self.export_format](
+            self.column_batches(request, es_generator),
+            self.field_names, self.column_types())
+
     def render_to_response(self, request, data, **response_kwargs):
-        gen = self.result_generator(request, data)
-        response = StreamingHttpResponse(gen, content_type="text/csv")
+        if isinstance(data, dict):
+            # The estimate of a preflight
+            return HttpResponse(dumps(data), content_type='application/json')
+        if isinstance(data, export_jobs.Job):
+            if not data.download:
+                return export_jobs.status_response(request, data.state)
+            self.export_format = data.state['format']
+        content_type, extension = self.export_formats[self.export_format]
+        if isinstance(data, export_jobs.Job):
+            response = export_jobs.download_response(
+                request, data.state, content_type)
+            if response['Content-Type'] == 'application/gzip':
+                extension += '.gz'
+        elif isinstance(data, prebuilt.PrebuiltExport):
+            response = prebuilt.file_response(request, data)
+        else:
+            summary = preflight.ExportSummary(
+                settings.ELASTIC_INDICES[self.index], self.export_format)
+            gen = summary.count_bytes(
+                self.export_chunks(request, summary.count_rows(data)))
+            encoding = None
+            if self.compressible():
+                encoding = compression.negotiate(
+                    request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            if encoding:
+                gen = compression.compress_stream(gen, encoding)
+            response = StreamingHttpResponse(gen, content_type=content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+            patch_vary_headers(response, ('Accept-Encoding',))
+            if self.resume:
+                self.add_resume_headers(response)
         response['Content-Disposition'] = \
             'attachment; ' \
-            'filename="export_{0:%Y%m%d_%H%M%S}.csv"'.format(datetime.now(
-                tz=timezone('Europe/Amsterdam')))
+            'filename="export_{0:%Y%m%d_%H%M%S}.{1}"'.format(datetime.now(
+                tz=timezone('Europe/Amsterdam')), extension)
         return response
+
+    def add_resume_headers(self, response):
+        """
+        Tells the client how to continue a broken off download,
+        see resumable.py
+        """
+        response['Accept-Ranges'] = resumable.RANGE_UNIT
+        response['ETag'] = self.export_etag()
+        if self.resume.offset:
+            response.status_code = 206
+            response['Content-Range'] = \
+                f'{resumable.RANGE_UNIT} {self.resume.offset}-*/*'
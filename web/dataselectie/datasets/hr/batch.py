@@ -6,6 +6,8 @@ from datasets.bag import models as bag_models
 from datasets.hr import models
 
 from . import documents
+from . import queries
+from . import views
 from ..generic import index
 
 log = logging.getLogger(__name__)
@@ -60,6 +62,7 @@ class IndexHrTask(index.ImportIndexTask):
         )
         .order_by('id')
     )
+    export_view = views.HrCSV
 
     def convert(self, obj: models.DataSelectie) -> documents.Inschrijving:
         vestiging = obj
@@ -77,3 +80,32 @@ class BuildIndexHrJob(object):
     @staticmethod
     def tasks():
         return [IndexHrTask()]
+
+
+class FacetStatsDsHRTask(index.FacetStatsTask):
+    index = settings.ELASTIC_INDICES['DS_HR_INDEX']
+    facets = queries.FACETS
+
+
+class ExportStatsDsHRTask(index.ExportStatsTask):
+    view = views.HrCSV
+
+
+class FacetStatsIndexDsHRJob(object):
+    name = "Collect facet and export statistics of the HR search-index"
+
+    @staticmethod
+    def tasks():
+        return [FacetStatsDsHRTask(), ExportStatsDsHRTask()]
+
+
+class PrebuiltExportDsHRTask(index.PrebuiltExportTask):
+    view = views.HrCSV
+
+
+class PrebuiltExportIndexDsHRJob(object):
+    name = "Write the prebuilt exports of the HR search-index"
+
+    @staticmethod
+    def tasks():
+        return [PrebuiltExportDsHRTask()]
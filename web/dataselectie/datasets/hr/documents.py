@@ -34,6 +34,8 @@ class Inschrijving(es.Document):
     """
     maatschappelijke_activiteit_id = es.Keyword()
     vestiging_id = es.Keyword()
+    # Same as the document id, used as unique sort key
+    inschrijving_id = es.Keyword()
 
     dataset = es.Keyword()
 
@@ -108,6 +110,10 @@ class Inschrijving(es.Document):
 
     bijzondere_rechtstoestand = es.Keyword()
 
+    # The line of the document in the CSV export, see
+    # ImportIndexTask.export_view
+    export_row = es.Keyword(index=False, doc_values=False)
+
     class Meta:
         all = es.MetaField(enabled=False)
         doc_type = 'vestiging'
@@ -386,6 +392,7 @@ def inschrijving_from_hrdataselectie(
     _id = inschrijving.get('id') or inschrijving['vestigingsnummer']
     dataset = inschrijving['dataset']
     doc = Inschrijving(_id=f"{dataset}{_id}")
+    doc.inschrijving_id = f"{dataset}{_id}"
     doc.dataset = dataset
     doc.bag_numid = ds_record.bag_numid
 
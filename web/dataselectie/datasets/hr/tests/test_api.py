@@ -9,7 +9,9 @@ from django.test import Client, TestCase
 from elasticsearch import Elasticsearch
 
 # Project
+from datasets.generic.queries import verify_plan
 from datasets.generic.tests.authorization import AuthorizationSetup
+from datasets.hr import views
 from .factories import create_hr_data
 
 HR_BASE_QUERY = '/dataselectie/hr/?{}'
@@ -176,6 +178,23 @@ class DataselectieApiTest(ESTestCase, AuthorizationSetup):
         self.assertIn('4110', sbis)
         self.assertIn('4120', sbis)
 
+    def test_get_dataselectie_hr_repeated_sbi_code(self):
+        """
+        Repeated and list parameters give the same selection
+        """
+        responses = [
+            self.client.get(
+                HR_BASE_QUERY.format(urlencode(q, doseq=True)),
+                **self.header_auth_scope_hr_r).json()
+            for q in (
+                {'page': 1, 'sbi_code': ['351', '41']},
+                {'page': 1, 'sbi_code': "['41', '351']"},
+            )]
+
+        self.assertEqual(len(responses[0]['object_list']), 3)
+        self.assertEqual(
+            responses[0]['object_list'], responses[1]['object_list'])
+
     def test_get_dataselectie_hr_match_sbi_code(self):
         """
         Test elastic querying on field `sbi_code` top-down
@@ -383,6 +402,14 @@ class DataselectieApiTest(ESTestCase, AuthorizationSetup):
             res['object_count'], 6)
         self.assertNotIn('aggs_list', res)
 
+    def test_query_plans(self):
+        """
+        Test geolocation and export queries have no aggs or sort
+        """
+        verify_plan(
+            views.HrGeoLocationSearch().elastic_query(''), 'geolocation')
+        verify_plan(views.HrCSV().elastic_query(''), 'export')
+
     def test_get_dataselectiehr_geolocation_no_auth(self):
         response = self.client.get('/dataselectie/hr/geolocation/')
 
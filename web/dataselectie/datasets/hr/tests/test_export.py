@@ -1,13 +1,16 @@
 # Python
+import gzip
+import json
 from urllib.parse import urlencode
 
 # Packages
 from django.conf import settings
 from django.core.management import call_command
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from elasticsearch import Elasticsearch
 
 # Project
+from datasets.hr.views import HrCSV
 from datasets.generic.tests.authorization import AuthorizationSetup
 from datasets.generic.tests.authorization import AUTH_HEADER
 from .factories import create_hr_data
@@ -82,3 +85,72 @@ class DataselectieExportTest(ESTestCase, AuthorizationSetup):
         res = res.split('\r\n')
         # 2 lines: headers + 1 items
         self.assertEqual(len(res), 2)
+
+    def test_export_rows_hr(self):
+        """
+        Test the CSV export is made of the lines stored in the index
+        """
+        hits = Elasticsearch(hosts=settings.ELASTIC_SEARCH_HOSTS).search(
+            index=settings.ELASTIC_INDICES['DS_HR_INDEX'],
+            body={'size': 100})['hits']['hits']
+        sources = [hit['_source'] for hit in hits]
+        rows = [source.pop('export_row') for source in sources]
+        self.assertEqual(HrCSV().render_rows(sources), rows)
+
+        self.headers = {AUTH_HEADER: f'Bearer {self.token_scope_hr_r}'}
+        response = self.client.get('/dataselectie/hr/export/', **self.headers)
+        lines = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(
+            sorted(lines.split('\r\n')[1:-1]),
+            sorted(row[:-2] for row in rows))
+
+    def test_ndjson_export_hr(self):
+        self.headers = {AUTH_HEADER: f'Bearer {self.token_scope_hr_r}'}
+        response = self.client.get(
+            '/dataselectie/hr/export/', {'format': 'ndjson'}, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 5)
+        for row in rows:
+            self.assertEqual(list(row), HrCSV.field_names)
+
+    def test_export_job_hr(self):
+        self.headers = {AUTH_HEADER: f'Bearer {self.token_scope_hr_r}'}
+        url = '/dataselectie/hr/export/'
+        streamed = b''.join(
+            self.client.get(url, **self.headers).streaming_content)
+
+        response = self.client.get(url, {'async': 'true'}, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        job = response.json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['rows'], 5)
+
+        response = self.client.get(
+            job['download_url'], HTTP_ACCEPT_ENCODING='gzip', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(gzip.decompress(
+                b''.join(response.streaming_content)).split(b'\r\n')),
+            sorted(streamed.split(b'\r\n')))
+
+    def test_export_resumable_hr(self):
+        self.headers = {AUTH_HEADER: f'Bearer {self.token_scope_hr_r}'}
+        url = '/dataselectie/hr/export/'
+        with override_settings(DOWNLOAD_BATCH=2):
+            response = self.client.get(
+                url, {'resumable': 'true'}, **self.headers)
+            self.assertEqual(response.status_code, 200)
+            lines = b''.join(response.streaming_content).split(b'\r\n')
+            # The header, 5 rows and the empty last line
+            self.assertEqual(len(lines), 7)
+
+            resumed = self.client.get(
+                url, {'resumable': 'true'}, HTTP_RANGE='rows=3-',
+                HTTP_IF_RANGE=response['ETag'], **self.headers)
+            self.assertEqual(resumed.status_code, 206)
+            self.assertEqual(
+                b''.join(resumed.streaming_content).split(b'\r\n'),
+                lines[4:])
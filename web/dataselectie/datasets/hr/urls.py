@@ -7,5 +7,12 @@ from . import views
 urlpatterns = (
     url(r'^$', views.HrSearch.as_view()),
     url(r'^export/$', views.HrCSV.as_view()),
+    url(r'^export/preflight/$', views.HrCSV.as_view(),
+        {'preflight': True}),
+    url(r'^export/jobs/(?P<job_id>[0-9a-f]{40})/$', views.HrCSV.as_view()),
+    url(r'^export/jobs/(?P<job_id>[0-9a-f]{40})/download/$',
+        views.HrCSV.as_view(), {'download': True}),
     url(r'^geolocation/$', views.HrGeoLocationSearch.as_view()),
+    url(r'^tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$',
+        views.HrTiles.as_view()),
 )
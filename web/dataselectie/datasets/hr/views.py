@@ -6,12 +6,15 @@ from django.conf import settings
 
 import authorization_levels
 
-from datasets.generic.views_mixins import CSVExportView, create_geometry_dict
+from datasets.generic.views_mixins import CSVExportView, create_geometry_dicts
 from datasets.generic.views_mixins import GeoLocationSearchView
 from datasets.generic.views_mixins import TableSearchView
+from datasets.generic.views_mixins import VectorTileView
 from datasets.generic.views_mixins import stringify_item_value
+from datasets.generic.views_mixins import parse_filter_values
 
-from datasets.hr.queries import meta_q
+from datasets.hr import documents
+from datasets.hr.queries import meta_q, FACETS
 
 
 class HrBase(object):
@@ -47,36 +50,42 @@ class HrBase(object):
         'openbare_ruimte': 'bezoekadres_openbare_ruimte',
     }
     selection = []
+    sort_tiebreaker = 'inschrijving_id'
+    document = documents.Inschrijving
+    authorization_scopes = (authorization_levels.SCOPE_HR_R,)
+    facets = FACETS
 
 
 class HrGeoLocationSearch(HrBase, GeoLocationSearchView):
 
     def elastic_query(self, query):
-        return meta_q(query, True)
+        return meta_q(query, False, False)
+
+
+class HrTiles(HrBase, VectorTileView):
+    layer = 'vestiging'
+
+    def elastic_query(self, query):
+        return meta_q(query, False, False)
 
 
 class HrSearch(HrBase, TableSearchView):
+    # The sbi levels are only used for the facets
+    default_source = {
+        'exclude': [
+            'sbi_l1', 'sbi_l2', 'sbi_l3', 'sbi_l4', 'sbi_l5', 'export_row']
+    }
 
     def elastic_query(self, query: dict) -> dict:
-        return meta_q(query, add_aggs=True, sort=True)
+        return meta_q(
+            query, add_aggs=True, sort=True, facets=self.requested_facets())
 
     def _prepare_sbi_param(self, request) -> list:
         # Retrieving the request parameters
         request_parameters = getattr(request, self.request.method)
-        #
-        sbi_codes = request_parameters.get('sbi_code', None)
-
-        sbi_codes = self._convert_value_to_list(sbi_codes)
-
-        if not sbi_codes:
-            return []
-
-        # make sure we get a list of strings
-        if not isinstance(sbi_codes, list):
-            sbi_codes = [sbi_codes, ]
-        # make sure everything is string
-        sbi_codes = list(map(str, sbi_codes))
-        return sbi_codes
+        # a list of strings, also when sbi_code is a single value
+        return list(parse_filter_values(
+            self._parameter_values(request_parameters, 'sbi_code')))
 
     def custom_aggs(self, elastic_data: dict, request) -> None:
         """
@@ -182,6 +191,7 @@ class HrCSV(HrBase, CSVExportView):
 
     field_names = [h[0] for h in fields_and_headers]
     csv_headers = [h[1] for h in fields_and_headers]
+    prebuilt = True
 
     def elastic_query(self, query):
         return meta_q(query, False, False)
@@ -198,9 +208,11 @@ class HrCSV(HrBase, CSVExportView):
             date = parse(datum_aanvang)
             item['datum_aanvang'] = date.strftime('%Y-%m-%d')
 
-        create_geometry_dict(item)
         return item
 
+    def batch_data_update(self, items, request):
+        create_geometry_dicts(items, formatted=self.export_format == 'csv')
+
     def sanitize_fields(self, item, field_names):
         item.update(
             {field_name: stringify_item_value(item.get(field_name, None))
@@ -20,6 +20,7 @@ echo $FAIL
 
 if [ "$FAIL" == "0" ];
 then
+    python manage.py elastic_indices bag --stats --exports
     echo "YAY!"
 else
     echo "FAIL! ($FAIL)"
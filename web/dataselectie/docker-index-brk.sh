@@ -19,6 +19,7 @@ echo $FAIL
 
 if [ "$FAIL" == "0" ];
 then
+    python manage.py elastic_indices brk --stats
     echo "YAY!"
 else
     echo "FAIL! ($FAIL)"
@@ -21,6 +21,7 @@ echo $FAIL
 
 if [ "$FAIL" == "0" ];
 then
+    python manage.py elastic_indices hr --stats --exports
     echo "YAY!"
 else
     echo "FAIL! ($FAIL)"
@@ -1,9 +1,11 @@
 # from unittest.mock import Mock
 # from django.http import HttpResponse
 from datasets.bag.tests.test_api import ESTestCase
+from datasets.bag import views
 from datasets.bag.tests import fixture_utils
 
 from datasets.hr.tests.factories import create_hr_data
+from django.conf import settings
 from django.core.management import call_command
 
 from django.test import Client
@@ -35,6 +37,32 @@ class StatusViewsTest(ESTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.content, b'Data OK')
 
+    def test_status_request_cache(self):
+        """check request cache metrics url"""
+        fixture_utils.create_nummeraanduiding_fixtures()
+        self.rebuild_elastic_index()
+
+        index = settings.ELASTIC_INDICES['DS_BAG_INDEX']
+        response = self.client.get('/status/request_cache')
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()
+        self.assertIn(index, stats)
+        self.assertIn('hit_rate', stats[index])
+        hit_count = stats[index]['hit_count']
+
+        # the same aggregation-only search twice, past the search
+        # result cache, so the second one is answered by elastic
+        # from its request cache
+        views.BagSearch.use_cache = False
+        try:
+            self.client.get('/dataselectie/bag/?page=1')
+            self.client.get('/dataselectie/bag/?page=2')
+        finally:
+            views.BagSearch.use_cache = True
+
+        stats = self.client.get('/status/request_cache').json()
+        self.assertGreater(stats[index]['hit_count'], hit_count)
+
     def test_status_health_not_ok(self):
 
         # empty the indexes.
@@ -5,4 +5,5 @@ from health import views
 urlpatterns = [
     url(r'^health$', views.health),
     url(r'^data$', views.check_data),
+    url(r'^request_cache$', views.request_cache),
 ]
@@ -3,10 +3,11 @@ import logging
 
 from django.conf import settings
 from django.db import connection
-from django.http import HttpResponse
-from elasticsearch import Elasticsearch
+from django.http import HttpResponse, JsonResponse
 from elasticsearch_dsl import Search
 
+from datasets.generic.elastic import get_client, request_timeout
+
 log = logging.getLogger(__name__)
 
 
@@ -17,8 +18,8 @@ def health(request):
 
     # check elasticsearch
     try:
-        client = Elasticsearch(settings.ELASTIC_SEARCH_HOSTS)
-        assert client.info()
+        client = get_client()
+        assert client.info(request_timeout=request_timeout('health'))
     except:
         log.exception("Elasticsearch connectivity failed")
         message += "\nElasticsearch connectivity failed."
@@ -36,7 +37,7 @@ def check_data(request):
 
     # check elastic
     try:
-        client = Elasticsearch(settings.ELASTIC_SEARCH_HOSTS)
+        client = get_client()
         keys = [key for key in settings.ELASTIC_INDICES.keys() if key != 'DS_BRK_INDEX']
         for index in keys:
             # check that we have some documents in index.
@@ -45,6 +46,7 @@ def check_data(request):
                 Search()
                 .using(client)
                 .index(es_index)
+                .params(request_timeout=request_timeout('health'))
                 .query("match_all").count())
             log.debug('%s -  %s', es_index, count)
             assert count
@@ -58,3 +60,31 @@ def check_data(request):
         message = "Data OK"
 
     return HttpResponse(message, content_type='text/plain', status=status)
+
+
+def request_cache(request):
+    # hit rate of the elastic shard request cache per index
+    status = 200
+    stats = {}
+
+    try:
+        client = get_client()
+        result = client.indices.stats(
+            index=','.join(settings.ELASTIC_INDICES.values()),
+            metric='request_cache',
+            request_timeout=request_timeout('health'))
+        for index, index_stats in result['indices'].items():
+            cache_stats = index_stats['total']['request_cache']
+            lookups = cache_stats['hit_count'] + cache_stats['miss_count']
+            stats[index] = {
+                'hit_count': cache_stats['hit_count'],
+                'miss_count': cache_stats['miss_count'],
+                'hit_rate': cache_stats['hit_count'] / lookups if lookups else None,
+                'evictions': cache_stats['evictions'],
+                'memory_size_in_bytes': cache_stats['memory_size_in_bytes'],
+            }
+    except:
+        log.exception("Elasticsearch request cache stats failed")
+        status = 500
+
+    return JsonResponse(stats, status=status)